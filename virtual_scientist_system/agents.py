@@ -1,23 +1,50 @@
+import asyncio
 import os
-import requests
+import time
+import weakref
+import httpx
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# One keep-alive client per event loop, shared by every agent instance
+_clients = weakref.WeakKeyDictionary()
+
+def get_http_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        timeout = httpx.Timeout(float(os.getenv("DUCKDUCKGO_TIMEOUT", "5")), connect=2.0)
+        client = _clients[loop] = httpx.AsyncClient(timeout=timeout)
+    return client
+
 class DuckDuckGoAgent:
-    def __init__(self):
+    def __init__(self, base_url=None, ttl=3600):
         self.name = "DuckDuckGo Agent"
+        self.base_url = base_url or os.getenv("DUCKDUCKGO_API_URL", "https://api.duckduckgo.com/")
+        self.ttl = ttl
+        self.cache = {}
 
     async def query(self, topic):
+        key = " ".join(topic.split()).casefold()
+        cached = self.cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
         try:
-            # Perform the query using DuckDuckGo API
-            response = requests.get(f"https://api.duckduckgo.com/?q={topic}&format=json")
+            # Perform the query using DuckDuckGo API without blocking the event loop
+            response = await get_http_client().get(
+                self.base_url,
+                params={"q": topic, "format": "json", "no_html": 1},  # URL-encoded by httpx
+            )
             response.raise_for_status()  # Raise error for unsuccessful responses
-            
-            # Print the full response for debugging
-            print("Full API Response:", response.json())  # Debugging line
-            
-            # Return the abstract (summary) of the topic from DuckDuckGo results
-            return response.json().get('Abstract', 'No result found')
-        except requests.exceptions.RequestException as e:
-            return f"Error querying DuckDuckGo: {str(e)}"
\ No newline at end of file
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            return f"Error querying DuckDuckGo: {str(e)}"
+
+        # Return the abstract (summary) of the topic from DuckDuckGo results
+        result = data.get('Abstract') or 'No result found'
+        if len(self.cache) >= 512:
+            self.cache.pop(next(iter(self.cache)))  # drop the oldest entry
+        self.cache[key] = (result, time.monotonic() + self.ttl)
+        return result
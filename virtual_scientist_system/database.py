@@ -4,45 +4,200 @@ import os
 
 load_dotenv()
 
+import atexit
+import queue
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 
-def connect_db():
-    """Establishes a connection to PostgreSQL."""
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"), 
-        user=os.getenv("DB_USER"), 
-        password=os.getenv("DB_PASS"), 
-        host=os.getenv("DB_HOST"), 
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+def connection_settings():
+    return dict(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        host=os.getenv("DB_HOST"),
         port=os.getenv("DB_PORT")
     )
+
+def connect_db():
+    """Establishes a connection to PostgreSQL."""
+    conn = psycopg2.connect(**connection_settings())
     return conn
 
+def get_pool():
+    """Returns the process-wide connection pool, sized by DB_POOL_MIN and DB_POOL_MAX."""
+    global _pool, _pool_slots
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None:
+            max_connections = int(os.getenv("DB_POOL_MAX", "10"))
+            # ThreadedConnectionPool raises when exhausted, so callers wait on a semaphore instead
+            _pool_slots = threading.BoundedSemaphore(max_connections)
+            _pool = ThreadedConnectionPool(
+                int(os.getenv("DB_POOL_MIN", "1")),
+                max_connections,
+                **connection_settings()
+            )
+    return _pool
+
+@contextmanager
+def pooled_connection():
+    """Borrows a pooled connection, committing on success and rolling back on error.
+
+    Waits up to DB_POOL_WAIT_SECONDS for a free connection before raising PoolError.
+    """
+    pool = get_pool()
+    if not _pool_slots.acquire(timeout=float(os.getenv("DB_POOL_WAIT_SECONDS", "30"))):
+        raise PoolError("Timed out waiting for a pooled database connection")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=conn.closed != 0)
+        _pool_slots.release()
+
+def store_query_responses(rows):
+    """Stores many (agent, topic, response) rows in a single round trip."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        execute_values(
+            cursor,
+            sql.SQL("INSERT INTO agent_responses (agent_name, topic, response) VALUES %s"),
+            rows,
+        )
+
+def is_transient_error(error):
+    """Connection-level failures worth retrying; anything else is treated as a problem with the rows."""
+    return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError))
+
+class WriteBehindQueue:
+    """Buffers inserts on a background thread and flushes them in batches by size, age or at shutdown.
+
+    A batch that fails with a transient error is retried with exponential backoff; one that fails
+    for any other reason is written row by row, so a single bad row only loses itself.
+    """
+
+    def __init__(self, write_batch, batch_size=50, flush_interval=1.0, retries=3, retry_backoff=0.5,
+                 is_transient=is_transient_error):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.is_transient = is_transient
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self.thread.start()
+
+    def put(self, row):
+        self.pending.put(row)
+
+    def flush(self):
+        """Blocks until every row queued so far has been written."""
+        self.pending.join()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def _write(self, batch):
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                self.write_batch(batch)
+                return
+            except Exception as e:
+                error = e
+            if not self.is_transient(error) or attempt == self.retries:
+                break
+            time.sleep(delay)
+            delay *= 2
+
+        if self.is_transient(error) or len(batch) == 1:
+            print(f"Failed to write {len(batch)} queued rows: {error}")
+            return
+        for row in batch:
+            try:
+                self.write_batch([row])
+            except Exception as e:
+                print(f"Failed to write a queued row: {e}")
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Returns the agent_responses write-behind queue, tuned by DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL and DB_WRITE_RETRIES."""
+    global _writer
+    if _writer is not None:
+        return _writer
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(
+                store_query_responses,
+                batch_size=int(os.getenv("DB_WRITE_BATCH_SIZE", "50")),
+                flush_interval=float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "1.0")),
+                retries=int(os.getenv("DB_WRITE_RETRIES", "3")),
+                retry_backoff=float(os.getenv("DB_WRITE_RETRY_BACKOFF", "0.5")),
+            )
+            atexit.register(_writer.flush)
+    return _writer
+
+def flush_writes():
+    """Waits for queued inserts to reach the database."""
+    if _writer is not None:
+        _writer.flush()
+
 def store_query_response(agent, topic, response):
-    """Stores query and response in the database."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    query = sql.SQL("""
-        INSERT INTO agent_responses (agent_name, topic, response)
-        VALUES (%s, %s, %s);
-    """)
-    cursor.execute(query, (agent, topic, response))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    """Stores query and response in the database.
+
+    Rows are queued and written in the background unless DB_WRITE_BEHIND=0.
+    """
+    if os.getenv("DB_WRITE_BEHIND", "1") == "0":
+        store_query_responses([(agent, topic, response)])
+    else:
+        get_writer().put((agent, topic, response))
 
 def create_table():
     """Creates the necessary table to store query and response data."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS agent_responses (
-            id SERIAL PRIMARY KEY,
-            agent_name VARCHAR(255),
-            topic VARCHAR(255),
-            response TEXT
-        );
-    """)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS agent_responses (
+                id SERIAL PRIMARY KEY,
+                agent_name VARCHAR(255),
+                topic VARCHAR(255),
+                response TEXT
+            );
+        """)
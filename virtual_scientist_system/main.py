@@ -1,9 +1,16 @@
 import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from groq import Groq
 from prompts import S1_PROMPT, S2_PROMPT, S3_PROMPT, GROQ_FINAL_PROMPT, S0_START_PROMPT, S0_END_PROMPT  # Import prompts
+from rate_limit import get_governor, estimate_tokens
 from dotenv import load_dotenv
 load_dotenv()
 
+def create_completion(client, **params):
+    """chat.completions.create behind the shared rate limiter, concurrency cap and retry policy."""
+    return get_governor().call(lambda: client.chat.completions.create(**params), estimate_tokens(params))
+
 class Scientist:
     def __init__(self, name, agent, prompt):
         self.name = name
@@ -14,8 +21,9 @@ class Scientist:
     def query_tool(self, topic):
         print(f"{self.name} is querying the agent for the topic '{topic}'...")
         # Use Groq's chat completion for querying (assuming it's synchronous)
-        completion = self.agent.chat.completions.create(
-            model="llama3-8b-8192",
+        completion = create_completion(
+            self.agent,
+            model=os.getenv("LLM_MODEL", "llama3-8b-8192"),
             messages=[{"role": "system", "content": self.prompt}, {"role": "user", "content": topic}],
             temperature=1,
             max_tokens=1024,
@@ -25,24 +33,26 @@ class Scientist:
         )
         self.response = completion.choices[0].message.content  # Access the response directly
         print(f"Response from {self.name}: {self.response}")
+        return self.response
 
     def get_response(self):
         return self.response
 
 class ScientistS0:
     def start_conversation(self, topic, scientists):
-        tasks = [scientist.query_tool(topic) for scientist in scientists]
-        for task in tasks:
-            task  # Execute synchronously
+        # Query every scientist concurrently; each one is asked exactly once per topic
+        for scientist in scientists:
+            print(f"S0: {scientist.name}, can you provide detailed information on your topic?")
+        with ThreadPoolExecutor(max_workers=len(scientists)) as executor:
+            list(executor.map(lambda scientist: scientist.query_tool(topic), scientists))
         return "All tasks complete"
 
     def gather_responses(self, topic, scientists):
-        responses = {}
-        for scientist in scientists:
-            print(f"S0: {scientist.name}, can you provide detailed information on your topic?")
-            scientist.query_tool(topic)  # Fetch detailed information
-            responses[scientist.name] = scientist.get_response()  # Store the response
-        return responses
+        # Reuse the answers from start_conversation, only querying scientists that have none yet
+        pending = [scientist for scientist in scientists if scientist.get_response() is None]
+        if pending:
+            self.start_conversation(topic, pending)
+        return {scientist.name: scientist.get_response() for scientist in scientists}
 
     def format_response(self, topic, scientists):
         # Print S0 introduction from prompts
@@ -79,10 +89,11 @@ class ScientistS0:
             S3_FINDINGS=s3_response
         )
 
-        # Print the final abstract
-        client = Groq()
-        completion = client.chat.completions.create(
-        model="llama3-8b-8192",  # Use the appropriate model
+        # Print the final abstract, reusing the scientists' Groq client
+        client = scientists[0].agent
+        completion = create_completion(
+        client,
+        model=os.getenv("LLM_MODEL", "llama3-8b-8192"),
         messages=[
             {"role": "system", "content": final_abstract}
         ],
@@ -0,0 +1,258 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class TokenBucket:
+    """Continuously refilling bucket; reservations may go into debt and report how long to wait."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Takes `amount` from the bucket and returns the seconds to wait before using it."""
+        if self.capacity <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            self.available -= min(amount, self.capacity)
+            return max(0.0, -self.available / self.rate)
+
+
+class RateLimiter:
+    """Client-side requests-per-minute and tokens-per-minute limits shared by every LLM call."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def _reserve(self, tokens):
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def acquire(self, tokens):
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens):
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class _Waiter:
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def notify(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+        else:
+            self.event.set()
+
+
+class AdaptiveConcurrency:
+    """Concurrency cap shared by threads and event loops that halves on throttling and creeps back up on success."""
+
+    def __init__(self, min_limit=1, max_limit=16):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def _try_acquire(self):
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _wake(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            self.in_flight += 1
+            waiter.granted = True
+            waiter.notify()
+
+    def acquire(self):
+        with self.lock:
+            if self._try_acquire():
+                return
+            waiter = _Waiter()
+            self.waiters.append(waiter)
+        waiter.event.wait()
+
+    async def aacquire(self):
+        with self.lock:
+            if self._try_acquire():
+                return
+            waiter = _Waiter(asyncio.get_running_loop())
+            self.waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self.lock:
+                if waiter.granted:
+                    self.in_flight -= 1
+                    self._wake()
+                else:
+                    self.waiters.remove(waiter)
+            raise
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self):
+        with self.lock:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def on_throttle(self):
+        with self.lock:
+            self.limit = max(self.min_limit, self.limit / 2)
+
+
+def is_throttled(error):
+    return getattr(error, "status_code", None) == 429
+
+
+def is_retryable(error):
+    """429s, 5xx responses and connection failures are worth retrying; other API errors are not."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    try:
+        import httpx
+        from groq import APIConnectionError
+    except ImportError:
+        return False
+    return isinstance(error, (APIConnectionError, httpx.TransportError))
+
+
+def retry_delay(error, attempt, base_delay, max_delay):
+    """Honours Retry-After when the server sends it, otherwise full-jitter exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(max_delay, float(retry_after)) + random.uniform(0, base_delay)
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class CallGovernor:
+    """Runs LLM calls through the rate limiter and concurrency cap, retrying transient failures with jitter."""
+
+    def __init__(self, limiter, concurrency, max_retries=4, base_delay=0.5, max_delay=20.0, on_wait=None):
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.on_wait = on_wait
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _after_failure(self, error, attempt):
+        if is_throttled(error):
+            self.concurrency.on_throttle()
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        return retry_delay(error, attempt, self.base_delay, self.max_delay)
+
+    def _waited(self, started):
+        if self.on_wait is not None:
+            self.on_wait(time.perf_counter() - started)
+
+    def call(self, fn, tokens):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            self.limiter.acquire(tokens)
+            self.concurrency.acquire()
+            self._waited(started)
+            try:
+                result = fn()
+            except Exception as e:
+                self.concurrency.release()
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.concurrency.release()
+            self.concurrency.on_success()
+            return result
+
+    async def acall(self, fn, tokens):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            await self.limiter.aacquire(tokens)
+            await self.concurrency.aacquire()
+            self._waited(started)
+            try:
+                result = await fn()
+            except Exception as e:
+                self.concurrency.release()
+                delay = self._after_failure(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.concurrency.release()
+            self.concurrency.on_success()
+            return result
+
+
+def estimate_tokens(params):
+    """Rough prompt size (~4 characters per token) plus the completion budget the call declares."""
+    prompt_chars = sum(len(message["content"]) for message in params.get("messages", []))
+    return prompt_chars // 4 + (params.get("max_tokens") or 1024)
+
+
+_governor = None
+_lock = threading.Lock()
+
+
+def get_governor():
+    """Returns the process-wide governor configured by GROQ_RPM, GROQ_TPM, GROQ_MIN/MAX_CONCURRENCY and GROQ_MAX_RETRIES."""
+    global _governor
+    if _governor is not None:
+        return _governor
+
+    with _lock:
+        if _governor is None:
+            _governor = CallGovernor(
+                RateLimiter(
+                    float(os.getenv("GROQ_RPM", "30")),
+                    float(os.getenv("GROQ_TPM", "30000")),
+                ),
+                AdaptiveConcurrency(
+                    int(os.getenv("GROQ_MIN_CONCURRENCY", "1")),
+                    int(os.getenv("GROQ_MAX_CONCURRENCY", "16")),
+                ),
+                max_retries=int(os.getenv("GROQ_MAX_RETRIES", "4")),
+            )
+    return _governor
@@ -1,20 +1,108 @@
+import asyncio
 import os
-import requests
+import threading
+import weakref
 from dotenv import load_dotenv
+from llm_cache import MemoryCache
+from text_utils import normalize_topic
 
 load_dotenv()
 
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def _timeout():
+    import httpx
+
+    return httpx.Timeout(float(os.getenv("DUCKDUCKGO_TIMEOUT", "5")), connect=2.0)
+
+def get_http_client():
+    """Shared keep-alive HTTP client for synchronous searches."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                import httpx
+
+                _client = httpx.Client(timeout=_timeout())
+    return _client
+
+def get_async_http_client():
+    """Shared keep-alive HTTP client for the running event loop."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(timeout=_timeout())
+    return client
+
 class DuckDuckGoAgent:
-    def __init__(self):
+    def __init__(self, base_url=None, cache=None):
         self.name = "DuckDuckGo Agent"
+        self.base_url = base_url or os.getenv("DUCKDUCKGO_API_URL", "https://api.duckduckgo.com/")
+        self.cache = cache or MemoryCache(
+            max_entries=int(os.getenv("DUCKDUCKGO_CACHE_SIZE", "512")),
+            ttl=int(os.getenv("DUCKDUCKGO_CACHE_TTL", "3600")),
+        )
+
+    def _params(self, topic):
+        # httpx URL-encodes the query, unlike the f-string URL this used to build
+        return {"q": topic, "format": "json", "no_html": 1, "skip_disambig": 1}
+
+    def _extract(self, data):
+        """Uses the instant-answer abstract, falling back to the first related-topic snippets."""
+        abstract = data.get('Abstract') or data.get('AbstractText')
+        if abstract:
+            return abstract
+        related = [item.get('Text') for item in data.get('RelatedTopics', []) if item.get('Text')]
+        return "\n".join(related[:5]) or 'No result found'
 
     async def query(self, topic):
+        key = normalize_topic(topic)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        import httpx
+
         try:
-            response = requests.get(f"https://api.duckduckgo.com/?q={topic}&format=json")
-            response.raise_for_status()  
-            
-            print("Full API Response:", response.json())  
-            
-            return response.json().get('Abstract', 'No result found')
-        except requests.exceptions.RequestException as e:
-            return f"Error querying DuckDuckGo: {str(e)}"
\ No newline at end of file
+            response = await get_async_http_client().get(self.base_url, params=self._params(topic))
+            response.raise_for_status()
+            result = self._extract(response.json())
+        except (httpx.HTTPError, ValueError) as e:
+            return f"Error querying DuckDuckGo: {str(e)}"
+
+        self.cache.set(key, result)
+        return result
+
+    def query_sync(self, topic):
+        """Blocking counterpart of query() for the synchronous graph."""
+        key = normalize_topic(topic)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        import httpx
+
+        try:
+            response = get_http_client().get(self.base_url, params=self._params(topic))
+            response.raise_for_status()
+            result = self._extract(response.json())
+        except (httpx.HTTPError, ValueError) as e:
+            return f"Error querying DuckDuckGo: {str(e)}"
+
+        self.cache.set(key, result)
+        return result
+
+_agent = None
+
+def get_search_agent():
+    """Process-wide agent so every request shares the result cache."""
+    global _agent
+    if _agent is None:
+        with _lock:
+            if _agent is None:
+                _agent = DuckDuckGoAgent()
+    return _agent
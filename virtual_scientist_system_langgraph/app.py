@@ -1,15 +1,36 @@
-from flask import Flask, render_template, request
-from groq import Groq
-from prompts import S1_PROMPT, S2_PROMPT, S3_PROMPT, GROQ_FINAL_PROMPT,S0_START_PROMPT
-from langgraph.graph import StateGraph, START, END
-from pydantic import BaseModel, Field
-from typing import TypedDict
-from database import store_query_response
+import asyncio
+import concurrent.futures
+import json
+import operator
+import os
+import queue
+from functools import partial
+from flask import Flask, Response, render_template, request, stream_with_context, url_for
+from llm_client import create_completion, acreate_completion
+from llm_backends import get_backend
+from prompt_registry import get_prompt
+from typing import Annotated, TypedDict
+from database import store_query_response, fetch_stored_abstract, ensure_schema, history_enabled
+from graph_registry import register_graph, get_graph, warm_up
+from async_runner import run_blocking, run_coroutine, submit
+from llm_cache import get_cache, cache_key
+from agents import get_search_agent
+from micro_batch import complete, acomplete
+from deadlines import call_with_deadline, acall_with_deadline, degrade_on_deadline
+import checkpointing
+from topic_index import get_topic_index, index_enabled, similar_topic
+from jobs import get_job_queue
+from lifecycle import track_run, in_flight, draining
+from metrics import instrument_node, trace_run, render as render_metrics
+from context_builder import abstract_prompt
+from log_config import PAYLOAD, get_logger
 
 
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = get_logger("app")
+
 class ScientistState(TypedDict):
     topic: str
     s1_response: str
@@ -17,109 +38,425 @@ class ScientistState(TypedDict):
     s3_response: str
     final_abstract: str
     additional_notes: str
+    search_context: str
+    missing_sections: Annotated[list, operator.add]
 
 class Scientist:
-    def __init__(self, name, agent, prompt):
+    def __init__(self, name, backend, prompt):
         self.name = name
-        self.agent = agent
+        self.backend = backend
         self.prompt = prompt
-        self.response = None
 
-    def query_tool(self, topic):
-        print(f"{self.name} is querying the agent for the topic '{topic}'...")
-        completion = self.agent.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[{"role": "system", "content": self.prompt}, {"role": "user", "content": topic}],
+    def completion_params(self, topic, context=""):
+        user_message = f"{topic}\n\n{context}" if context else topic
+        return dict(
+            model=self.backend.model,
+            messages=[{"role": "system", "content": self.prompt.render()}, {"role": "user", "content": user_message}],
             temperature=1,
             max_tokens=1500,  
             top_p=1,
             stream=False,  
             stop=None,
         )
-        self.response = completion.choices[0].message.content  
-        print(f"Response from {self.name}: {self.response}")
-        return self.response
+
+    def query_tool(self, topic, context=""):
+        params = self.completion_params(topic, context)
+        key = cache_key(topic, self.prompt.fingerprint + context, params)
+        cache = get_cache()
+        response = cache.get(key)
+        if response is not None:
+            logger.info("%s reused a cached response for the topic %r", self.name, topic)
+            return response
+
+        logger.info("%s is querying the agent for the topic %r", self.name, topic)
+        response = call_with_deadline(self.name, lambda: complete(self.backend.client(), params))
+        cache.set(key, response)
+        logger.debug("Response from %s: %s", self.name, response, extra=PAYLOAD)
+        return response
+
+class AsyncScientist(Scientist):
+    async def query_tool(self, topic, context=""):
+        params = self.completion_params(topic, context)
+        key = cache_key(topic, self.prompt.fingerprint + context, params)
+        cache = get_cache()
+        response = await cache.aget(key)
+        if response is not None:
+            logger.info("%s reused a cached response for the topic %r", self.name, topic)
+            return response
+
+        logger.info("%s is querying the agent for the topic %r", self.name, topic)
+        response = await acall_with_deadline(self.name, lambda: acomplete(self.backend.async_client(), params))
+        await cache.aset(key, response)
+        logger.debug("Response from %s: %s", self.name, response, extra=PAYLOAD)
+        return response
 
 def start(state: ScientistState):
-    print("Starting the process...")
+    logger.info("Starting the process for the topic %r", state['topic'])
     return state
 
+S0_MODES = ("serial", "parallel", "static", "context")
+
+def s0_mode():
+    """How S0 is wired in, per deployment via S0_MODE:
+
+    serial   - S0 runs before S1-S3 (the original topology); its notes are unused
+    parallel - S0 runs alongside S1-S3, off the critical path (default)
+    static   - no LLM call; S0's kickoff prompt is recorded as its notes
+    context  - S0 runs first and its notes are passed to S1-S3
+    """
+    mode = os.getenv("S0_MODE", "parallel")
+    if mode not in S0_MODES:
+        raise ValueError(f"Unknown S0_MODE '{mode}', expected one of {', '.join(S0_MODES)}")
+    return mode
+
+def scientist_context(state: ScientistState, mode):
+    """Extra material appended to each scientist's question: search results and, in context mode, S0's notes."""
+    sections = []
+    if state.get('search_context'):
+        sections.append(f"DuckDuckGo search results:\n{state['search_context']}")
+    if mode == "context" and state.get('additional_notes'):
+        sections.append(f"Notes from S0:\n{state['additional_notes']}")
+    return "\n\n".join(sections)
+
+def static_kickoff_s0(state: ScientistState):
+    return {'additional_notes': get_prompt("S0").render().strip()}
+
+def search_enabled():
+    return os.getenv("SEARCH_ENABLED", "1") != "0"
+
+def usable_search_result(result):
+    if result.startswith("Error querying DuckDuckGo") or result == 'No result found':
+        return ''
+    return result
+
+def search_topic(state: ScientistState):
+    if not search_enabled():
+        return {'search_context': ''}
+    return {'search_context': usable_search_result(get_search_agent().query_sync(state['topic']))}
+
 def query_agent_s0(state: ScientistState):
     # S0 is now asking the topic question
-    groq_agent = Groq()
-    scientist_s0 = Scientist("S0", groq_agent, S0_START_PROMPT)
+    scientist_s0 = Scientist("S0", get_backend("S0"), get_prompt("S0"))
     s0_response = scientist_s0.query_tool(state['topic'])
     return {'additional_notes': s0_response}
 
-def query_agent_s1(state: ScientistState):
-    groq_agent = Groq()
-    scientist_s1 = Scientist("S1", groq_agent, S1_PROMPT)
-    response = scientist_s1.query_tool(state['topic'])
+def query_agent_s1(state: ScientistState, mode):
+    scientist_s1 = Scientist("S1", get_backend("S1"), get_prompt("S1"))
+    response = scientist_s1.query_tool(state['topic'], scientist_context(state, mode))
     return {'s1_response': response}
 
-def query_agent_s2(state: ScientistState):
-    groq_agent = Groq()
-    scientist_s2 = Scientist("S2", groq_agent, S2_PROMPT)
-    response = scientist_s2.query_tool(state['topic'])
+def query_agent_s2(state: ScientistState, mode):
+    scientist_s2 = Scientist("S2", get_backend("S2"), get_prompt("S2"))
+    response = scientist_s2.query_tool(state['topic'], scientist_context(state, mode))
     return {'s2_response': response}
 
-def query_agent_s3(state: ScientistState):
-    groq_agent = Groq()
-    scientist_s3 = Scientist("S3", groq_agent, S3_PROMPT)
-    response = scientist_s3.query_tool(state['topic'])
+def query_agent_s3(state: ScientistState, mode):
+    scientist_s3 = Scientist("S3", get_backend("S3"), get_prompt("S3"))
+    response = scientist_s3.query_tool(state['topic'], scientist_context(state, mode))
     return {'s3_response': response}
 
-def abstract_generation(state: ScientistState):
-    final_abstract_prompt = f"""
-    You professional summarizer. Your task is to generate a concise and well-structured abstract by summarizing the below responses:
-
-    1. Key insights from S1: {state['s1_response']}
-    2. Additional details provided by S2: {state['s2_response']}
-    3. Further perspectives shared by S3: {state['s3_response']}
-    4. Abstract should be only between 300-400 words. 
-    5. STRICTLY provide only the abstract.
-    6. Strictly rely on the provided text, without external information.
-    7. Your response should directly start with the abstract without any external metadata.
-    """
+def remember_topic(topic):
+    """Adds a topic whose abstract was just stored to the similarity index."""
+    if history_enabled() and index_enabled():
+        get_topic_index().add(topic)
+
+def missing_findings(state: ScientistState):
+    """S1-S3 sections absent from the abstract; S0's notes are not part of it, so a late S0 does not count."""
+    return sorted(set(state.get('missing_sections') or ()) & {'S1', 'S2', 'S3'})
+
+def partial_note(state: ScientistState):
+    return f"\n\n[Partial abstract: findings from {', '.join(missing_findings(state))} did not arrive in time.]"
 
-    client = Groq()
-    completion = client.chat.completions.create(
-        model="llama3-8b-8192",  
-        messages=[{"role": "system", "content": final_abstract_prompt}],
+def abstract_params(state: ScientistState):
+    return dict(
+        model=get_backend("ABSTRACT").model,
+        messages=[{"role": "system", "content": abstract_prompt(state)}],
         temperature=0.7,
         max_tokens=500,  
+        stream=True,
     )
 
-    final_abstract_response = completion.choices[0].message.content.strip()
+def released_state():
+    """Clears the scientist texts once the abstract is built, unless KEEP_SCIENTIST_RESPONSES=1."""
+    if os.getenv("KEEP_SCIENTIST_RESPONSES", "0") == "1":
+        return {}
+    return {'s1_response': '', 's2_response': '', 's3_response': '', 'additional_notes': '', 'search_context': ''}
+
+def abstract_cache_key(state: ScientistState, params):
+    return cache_key(state['topic'], params['messages'][0]['content'], params)
+
+def abstract_generation(state: ScientistState):
+    from langgraph.config import get_stream_writer
+
+    params = abstract_params(state)
+    key = abstract_cache_key(state, params)
+    cache = get_cache()
+    writer = get_stream_writer()
+
+    final_abstract_response = cache.get(key)
+    if final_abstract_response is not None:
+        writer({'token': final_abstract_response})
+    else:
+        client = get_backend("ABSTRACT").client()
+        tokens = []
+        for chunk in create_completion(client, **params):
+            token = chunk.choices[0].delta.content or ""
+            if token:
+                tokens.append(token)
+                writer({'token': token})
+
+        final_abstract_response = "".join(tokens).strip()
+        cache.set(key, final_abstract_response)
+
+    if missing_findings(state):
+        # Partial abstracts are returned but not kept, so the next request tries the full run again
+        final_abstract_response += partial_note(state)
+        writer({'token': partial_note(state)})
+    else:
+        store_query_response(state['topic'], final_abstract_response)
+        remember_topic(state['topic'])
+
+    logger.info("Generated a %d-character abstract for the topic %r", len(final_abstract_response), state['topic'])
+    logger.debug("Generated Abstract: %s", final_abstract_response, extra=PAYLOAD)
+
+    return {'final_abstract': final_abstract_response, **released_state()}
+
+async def asearch_topic(state: ScientistState):
+    if not search_enabled():
+        return {'search_context': ''}
+    return {'search_context': usable_search_result(await get_search_agent().query(state['topic']))}
+
+async def aquery_agent_s0(state: ScientistState):
+    scientist_s0 = AsyncScientist("S0", get_backend("S0"), get_prompt("S0"))
+    s0_response = await scientist_s0.query_tool(state['topic'])
+    return {'additional_notes': s0_response}
+
+async def aquery_agent_s1(state: ScientistState, mode):
+    scientist_s1 = AsyncScientist("S1", get_backend("S1"), get_prompt("S1"))
+    response = await scientist_s1.query_tool(state['topic'], scientist_context(state, mode))
+    return {'s1_response': response}
+
+async def aquery_agent_s2(state: ScientistState, mode):
+    scientist_s2 = AsyncScientist("S2", get_backend("S2"), get_prompt("S2"))
+    response = await scientist_s2.query_tool(state['topic'], scientist_context(state, mode))
+    return {'s2_response': response}
+
+async def aquery_agent_s3(state: ScientistState, mode):
+    scientist_s3 = AsyncScientist("S3", get_backend("S3"), get_prompt("S3"))
+    response = await scientist_s3.query_tool(state['topic'], scientist_context(state, mode))
+    return {'s3_response': response}
+
+async def aabstract_generation(state: ScientistState):
+    from langgraph.config import get_stream_writer
+
+    params = abstract_params(state)
+    key = abstract_cache_key(state, params)
+    cache = get_cache()
+    writer = get_stream_writer()
+
+    final_abstract_response = await cache.aget(key)
+    if final_abstract_response is not None:
+        writer({'token': final_abstract_response})
+    else:
+        client = get_backend("ABSTRACT").async_client()
+        tokens = []
+        async for chunk in await acreate_completion(client, **params):
+            token = chunk.choices[0].delta.content or ""
+            if token:
+                tokens.append(token)
+                writer({'token': token})
+
+        final_abstract_response = "".join(tokens).strip()
+        await cache.aset(key, final_abstract_response)
 
-    store_query_response(state['topic'], final_abstract_response)
+    if missing_findings(state):
+        final_abstract_response += partial_note(state)
+        writer({'token': partial_note(state)})
+    else:
+        # psycopg2 is blocking, so keep the insert off the event loop
+        await asyncio.to_thread(store_query_response, state['topic'], final_abstract_response)
+        await asyncio.to_thread(remember_topic, state['topic'])
 
-    print(f"Generated Abstract: {final_abstract_response}")
+    logger.info("Generated a %d-character abstract for the topic %r", len(final_abstract_response), state['topic'])
+    logger.debug("Generated Abstract: %s", final_abstract_response, extra=PAYLOAD)
 
-    return {'final_abstract': final_abstract_response}
+    return {'final_abstract': final_abstract_response, **released_state()}
+
+SYNC_NODES = {
+    "search": search_topic,
+    "query_s0": query_agent_s0,
+    "query_s1": query_agent_s1,
+    "query_s2": query_agent_s2,
+    "query_s3": query_agent_s3,
+    "abstract_generation": abstract_generation,
+}
+
+ASYNC_NODES = {
+    "search": asearch_topic,
+    "query_s0": aquery_agent_s0,
+    "query_s1": aquery_agent_s1,
+    "query_s2": aquery_agent_s2,
+    "query_s3": aquery_agent_s3,
+    "abstract_generation": aabstract_generation,
+}
+
+# Scientist nodes that may miss their deadline: node -> (role, state key it fills)
+SCIENTIST_OUTPUTS = {
+    "query_s0": ("S0", "additional_notes"),
+    "query_s1": ("S1", "s1_response"),
+    "query_s2": ("S2", "s2_response"),
+    "query_s3": ("S3", "s3_response"),
+}
+
+def create_workflow(nodes=SYNC_NODES, mode=None):
+    from langgraph.graph import StateGraph, START, END
+
+    mode = mode or s0_mode()
+    nodes = dict(nodes)
+    if mode == "static":
+        nodes["query_s0"] = static_kickoff_s0
 
-def create_workflow():
     workflow = StateGraph(ScientistState)
 
     workflow.add_node("start", start)
-    workflow.add_node("query_s0", query_agent_s0)
-    workflow.add_node("query_s1", query_agent_s1)
-    workflow.add_node("query_s2", query_agent_s2)
-    workflow.add_node("query_s3", query_agent_s3)
-    workflow.add_node("abstract_generation", abstract_generation)
+    scientists = ["query_s1", "query_s2", "query_s3"]
+    for name, node in nodes.items():
+        if name in scientists:
+            # Bound here rather than read from S0_MODE per run, so the nodes follow this graph's topology
+            node = partial(node, mode=mode)
+        if name in SCIENTIST_OUTPUTS:
+            node = degrade_on_deadline(*SCIENTIST_OUTPUTS[name], node)
+        workflow.add_node(name, instrument_node(name, node))
 
     workflow.add_edge(START, "start")
-    workflow.add_edge("start", "query_s0")  
-    workflow.add_edge("query_s0", "query_s1") 
-    workflow.add_edge("query_s0", "query_s2")  
-    workflow.add_edge("query_s0", "query_s3")  
-    workflow.add_edge("query_s1", "abstract_generation")  
-    workflow.add_edge("query_s2", "abstract_generation")  
-    workflow.add_edge("query_s3", "abstract_generation") 
+    workflow.add_edge("start", "search")
+    if mode in ("serial", "context"):
+        # S1-S3 wait for both S0 and the DuckDuckGo results
+        workflow.add_edge("start", "query_s0")  
+        for scientist in scientists:
+            workflow.add_edge(["query_s0", "search"], scientist)
+        workflow.add_edge(scientists, "abstract_generation")
+    else:
+        # Supersteps run in lockstep, so S0 shares the scientists' step to stay off the critical path
+        for node in ["query_s0"] + scientists:
+            workflow.add_edge("search", node)
+        workflow.add_edge(["query_s0"] + scientists, "abstract_generation")
     workflow.add_edge("abstract_generation", END)
 
     return workflow
 
+register_graph("default", create_workflow, checkpointed=True)
+register_graph("async", partial(create_workflow, ASYNC_NODES))
+
+def new_state(topic):
+    return {
+        'topic': topic,
+        's1_response': '',
+        's2_response': '',
+        's3_response': '',
+        'final_abstract': '',
+        'additional_notes': '',
+        'search_context': '',
+        'missing_sections': [],
+    }
+
+def request_timeout():
+    """REQUEST_TIMEOUT_SECONDS bounds generate_abstract in both graph modes; 0 disables the bound.
+
+    gthread workers keep heartbeating while a request thread runs, so GUNICORN_TIMEOUT does not
+    cut off a slow graph - this is the only limit on how long an index() request can take.
+    """
+    timeout = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "150"))
+    return timeout if timeout > 0 else None
+
+async def agenerate_abstract(topic):
+    with track_run(), trace_run(topic):
+        result = await get_graph("async").ainvoke(new_state(topic))
+    return result['final_abstract']
+
+def generate_abstract(topic):
+    if os.getenv("GRAPH_MODE", "sync") == "async":
+        return run_coroutine(agenerate_abstract(topic), request_timeout())
+    def run():
+        with track_run(), trace_run(topic):
+            return checkpointing.invoke(get_graph("default"), new_state(topic), topic)
+
+    # A timed-out run finishes in the background and still stores its abstract for the next request
+    return run_blocking(run, request_timeout())['final_abstract']
+
+def find_stored_abstract(topic):
+    """Looks up a previously generated abstract for `topic`, or for the most similar stored topic.
+
+    A failed lookup (database unreachable, pool exhausted) is logged and treated as a miss,
+    so the caller generates a fresh abstract instead of failing the request.
+    """
+    try:
+        return lookup_stored_abstract(topic)
+    except Exception as e:
+        logger.warning("Looking up a stored abstract for the topic %r failed, generating one instead: %s", topic, e)
+        return None
+
+def lookup_stored_abstract(topic):
+    max_age = os.getenv("ABSTRACT_MAX_AGE_SECONDS")
+    max_age = int(max_age) if max_age else None
+    stored = fetch_stored_abstract(topic, max_age)
+    if stored or not history_enabled():
+        return stored
+
+    similar = similar_topic(topic)
+    if similar is None:
+        return None
+    logger.info("Reusing the abstract for the similar topic %r", similar)
+    return fetch_stored_abstract(similar, max_age)
+
+def traced_stream(topic, stream_mode):
+    with track_run(), trace_run(topic):
+        yield from checkpointing.stream(get_graph("default"), new_state(topic), topic, stream_mode=stream_mode)
+
+def stream_abstract(topic, refresh=False):
+    """Yields (event, data) pairs as graph nodes finish and abstract tokens arrive."""
+    stored = None if refresh else find_stored_abstract(topic)
+    if stored:
+        yield "done", {'final_abstract': stored}
+        return
+
+    stream_mode = ["updates", "custom"]
+
+    if os.getenv("GRAPH_MODE", "sync") == "async":
+        events = queue.Queue()
+
+        async def pump():
+            try:
+                with track_run(), trace_run(topic):
+                    async for item in get_graph("async").astream(new_state(topic), stream_mode=stream_mode):
+                        events.put(item)
+            except Exception as e:
+                events.put(("error", str(e)))
+            finally:
+                events.put(None)
+
+        submit(pump())
+        chunks = iter(events.get, None)
+    else:
+        chunks = traced_stream(topic, stream_mode)
+
+    final_abstract = ""
+    for mode, chunk in chunks:
+        if mode == "custom":
+            yield "token", chunk
+        elif mode == "updates":
+            for node, update in chunk.items():
+                if update and update.get('final_abstract'):
+                    final_abstract = update['final_abstract']
+                yield "node", {'node': node}
+        else:
+            yield "error", {'message': chunk}
+            return
+    yield "done", {'final_abstract': final_abstract}
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 app = Flask(__name__)
 
 @app.route("/", methods=["GET", "POST"])
@@ -130,23 +467,76 @@ def index():
         topic = request.form.get("topic")
         
         if topic:
-            workflow = create_workflow()
+            refresh = request.args.get("refresh") == "1"
+            final_abstract = None if refresh else find_stored_abstract(topic)
+            if not final_abstract:
+                try:
+                    final_abstract = generate_abstract(topic)
+                except concurrent.futures.TimeoutError:
+                    return render_template("index.html", final_abstract="Generating the abstract took too long, please try again."), 504
+    
+    return render_template("index.html", final_abstract=final_abstract)
 
-            state_obj = {
-                'topic': topic,
-                's1_response': '',
-                's2_response': '',
-                's3_response': '',
-                'final_abstract': '',
-                'additional_notes': ''
-            }
+def run_job(topic):
+    return find_stored_abstract(topic) or generate_abstract(topic)
 
-            app_flow = workflow.compile()
-            result = app_flow.invoke(state_obj)
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    payload = request.get_json(silent=True) or request.form
+    topic = (payload.get("topic") or "").strip()
+    if not topic:
+        return {'error': "Topic cannot be empty."}, 400
 
-            final_abstract = result['final_abstract']
-    
-    return render_template("index.html", final_abstract=final_abstract)
+    job_id = get_job_queue(run_job).submit(topic)
+    status_url = url_for("job_status", job_id=job_id)
+    return {'id': job_id, 'status_url': status_url}, 202, {'Location': status_url}
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Returns the job; ?wait=N long-polls up to N seconds (capped by JOB_MAX_WAIT_SECONDS) for it to finish."""
+    try:
+        wait = min(float(request.args.get("wait", "0")), float(os.getenv("JOB_MAX_WAIT_SECONDS", "60")))
+    except ValueError:
+        return {'error': "wait must be a number of seconds."}, 400
+
+    jobs = get_job_queue(run_job)
+    job = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        return {'error': "Unknown job."}, 404
+    return job
+
+@app.route("/healthz")
+def healthz():
+    """Liveness/readiness probe; reports 503 once the process starts draining so balancers stop routing to it."""
+    status = 503 if draining() else 200
+    return {'status': "draining" if draining() else "ok", 'in_flight': in_flight()}, status
+
+@app.route("/metrics")
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/stream")
+def stream():
+    topic = request.args.get("topic", "").strip()
+    if not topic:
+        return Response(sse("error", {'message': "Topic cannot be empty."}), mimetype="text/event-stream")
+
+    refresh = request.args.get("refresh") == "1"
+
+    def generate():
+        try:
+            for event, data in stream_abstract(topic, refresh):
+                yield sse(event, data)
+        except Exception as e:
+            yield sse("error", {'message': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 if __name__ == "__main__":
+    ensure_schema()
+    warm_up()
     app.run(debug=True)
@@ -0,0 +1,62 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_loop = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_loop():
+    """Returns the background event loop shared by all async graph runs, starting it on first use."""
+    global _loop
+    if _loop is not None:
+        return _loop
+
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-graph-loop", daemon=True)
+            thread.start()
+            _loop = loop
+    return _loop
+
+
+def run_coroutine(coro, timeout=None):
+    """Runs `coro` on the shared loop from synchronous code and waits for its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:  # only an alias of the builtin TimeoutError from 3.11
+        future.cancel()  # stop the graph instead of letting it finish unobserved
+        raise
+
+
+def submit(coro):
+    """Schedules `coro` on the shared loop without waiting and returns its concurrent future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("GRAPH_POOL_SIZE", "64")), thread_name_prefix="sync-graph"
+                )
+    return _executor
+
+
+def run_blocking(fn, timeout=None):
+    """Runs the blocking `fn()` and waits at most `timeout` seconds for its result.
+
+    A thread cannot be interrupted, so a call that times out keeps running on the pool and its
+    result is discarded; the caller gets concurrent.futures.TimeoutError.
+    """
+    if timeout is None:
+        return fn()
+    return _get_executor().submit(contextvars.copy_context().run, fn).result(timeout)
@@ -0,0 +1,99 @@
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from text_utils import normalize_topic
+import checkpointing
+
+
+def read_topics(path, fmt=None):
+    """Reads topics from a JSONL or CSV file, or from stdin when `path` is '-'.
+
+    JSONL lines may be objects with a "topic" field or bare JSON strings; CSV files
+    use a "topic" column when present and the first column otherwise.
+    """
+    if fmt is None:
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+    handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            rows = list(csv.reader(handle))
+            if not rows:
+                return []
+            header = [column.strip().lower() for column in rows[0]]
+            if "topic" in header:
+                column = header.index("topic")
+                rows = rows[1:]
+            else:
+                column = 0
+            topics = [row[column] for row in rows if len(row) > column]
+        else:
+            topics = []
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                topics.append(item["topic"] if isinstance(item, dict) else item)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+    return [topic.strip() for topic in topics if topic and topic.strip()]
+
+
+def completed_topics(path):
+    """Returns the normalized topics that already have an abstract in the output file."""
+    if path == "-" or not os.path.exists(path):
+        return set()
+
+    done = set()
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a partially written last line from an interrupted run
+            if record.get("final_abstract") and not record.get("error"):
+                done.add(normalize_topic(record["topic"]))
+    return done
+
+
+def run_batch(graph, new_state, topics, output, concurrency=4):
+    """Runs `topics` through the compiled `graph`, appending one JSON line per topic as each finishes.
+
+    Topics already completed in `output` (or repeated in the input) are skipped, so an
+    interrupted run can be resumed with the same command. Returns (processed, skipped, failed).
+    """
+    done = completed_topics(output)
+    pending = []
+    for topic in topics:
+        key = normalize_topic(topic)
+        if key not in done:
+            done.add(key)
+            pending.append(topic)
+    skipped = len(topics) - len(pending)
+
+    handle = sys.stdout if output == "-" else open(output, "a", encoding="utf-8")
+    failed = 0
+    try:
+        # A graph-level max_concurrency would also throttle each topic's own S1-S3 fan-out,
+        # so the topic-level limit is applied with a dedicated pool instead.
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(checkpointing.invoke, graph, new_state(topic), topic): topic for topic in pending}
+            for future in as_completed(futures):
+                record = {'topic': futures[future]}
+                try:
+                    record['final_abstract'] = future.result()['final_abstract']
+                except Exception as e:
+                    failed += 1
+                    record['error'] = f"{type(e).__name__}: {e}"
+                handle.write(json.dumps(record) + "\n")
+                handle.flush()
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
+
+    return len(pending), skipped, failed
@@ -0,0 +1,171 @@
+"""Offline throughput/latency benchmark for the scientist graph.
+
+Swaps the Groq clients for fake_llm stand-ins and disables history, caching, DuckDuckGo
+search and the client-side rate limiter, so runs need no network or database:
+
+    python bench_pipeline.py --modes sync,async,batch,flask --concurrency 1,4,16 --topics 32
+    python bench_pipeline.py --latency-median 0.8 --tokens-per-second 250 --json results.json
+
+The flask mode posts to index() and follows GRAPH_MODE like the real server.
+Latency is measured per topic from the moment it is handed to the pipeline; in batch
+mode every topic is handed over at once, so its latencies include queueing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DB_ENABLED", "0")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("GROQ_RPM", "0")
+os.environ.setdefault("GROQ_TPM", "0")
+os.environ.setdefault("GROQ_MAX_CONCURRENCY", "1024")
+os.environ.setdefault("SEARCH_ENABLED", "0")
+os.environ.setdefault("CHECKPOINT_BACKEND", "none")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import app
+import batch
+from fake_llm import FakeAsyncGroq, FakeGroq, LatencyModel
+from graph_registry import get_graph
+from llm_client import install_clients
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def run_sync(topics, concurrency):
+    graph = get_graph("default")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda topic: timed(graph.invoke, app.new_state(topic)), topics))
+
+
+def run_async(topics, concurrency):
+    async def main():
+        graph = get_graph("async")
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(topic):
+            async with limit:
+                started = time.perf_counter()
+                await graph.ainvoke(app.new_state(topic))
+                return time.perf_counter() - started
+
+        return await asyncio.gather(*(one(topic) for topic in topics))
+
+    return asyncio.run(main())
+
+
+class _CompletionTimes:
+    """Wraps a compiled graph to record when each invoke() finishes, measured from `started`."""
+
+    def __init__(self, graph, started):
+        self.graph = graph
+        self.checkpointer = graph.checkpointer
+        self.started = started
+        self.latencies = []
+
+    def invoke(self, *args, **kwargs):
+        result = self.graph.invoke(*args, **kwargs)
+        self.latencies.append(time.perf_counter() - self.started)
+        return result
+
+
+def run_batch(topics, concurrency):
+    # Same topic-level pool as `main.py --batch`; a graph-level max_concurrency would also
+    # throttle each topic's own S0-S3 fan-out
+    graph = _CompletionTimes(get_graph("default"), time.perf_counter())
+    batch.run_batch(graph, app.new_state, topics, os.devnull, concurrency)
+    return graph.latencies
+
+
+def run_flask(topics, concurrency):
+    client = app.app.test_client()
+
+    def post(topic):
+        response = client.post("/", data={"topic": topic})
+        if response.status_code != 200:
+            raise RuntimeError(f"POST / returned {response.status_code}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda topic: timed(post, topic), topics))
+
+
+MODES = {"sync": run_sync, "async": run_async, "batch": run_batch, "flask": run_flask}
+
+
+def benchmark(mode, concurrency, count, run_index):
+    topics = [f"benchmark topic {mode} {concurrency} {run_index} {i}" for i in range(count)]
+    started = time.perf_counter()
+    latencies = MODES[mode](topics, concurrency)
+    elapsed = time.perf_counter() - started
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'topics': count,
+        'throughput': count / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'rss_mb': rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="sync,async,batch,flask")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--topics", type=int, default=32, help="topics per run")
+    parser.add_argument("--distribution", choices=["lognormal", "uniform", "fixed"], default="lognormal")
+    parser.add_argument("--latency-median", type=float, default=0.2, help="seconds to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="FILE", help="also write results as JSON")
+    args = parser.parse_args()
+
+    def latency():
+        return LatencyModel(args.distribution, args.latency_median, args.latency_sigma,
+                            args.tokens_per_second, args.completion_tokens, args.seed)
+
+    install_clients(FakeGroq(latency()), lambda: FakeAsyncGroq(latency()))
+    app.warm_up()
+
+    results = []
+    print(f"{'mode':<7}{'conc':>6}{'topics/s':>10}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'rss MB':>9}")
+    for mode in args.modes.split(","):
+        for run_index, concurrency in enumerate(int(level) for level in args.concurrency.split(",")):
+            result = benchmark(mode, concurrency, args.topics, run_index)
+            results.append(result)
+            print(f"{mode:<7}{concurrency:>6}{result['throughput']:>10.2f}{result['p50']:>9.3f}"
+                  f"{result['p95']:>9.3f}{result['p99']:>9.3f}{result['rss_mb']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
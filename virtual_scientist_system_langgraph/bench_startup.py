@@ -0,0 +1,61 @@
+"""Measures worker cold-start cost: importing app.py, warming up, and serving the first request.
+
+Each run happens in a fresh interpreter so module caches don't hide import cost:
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --topic "quantum error correction"   # also time a first POST (uses Groq)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import json, sys, time
+topic = sys.argv[1]
+
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.warm_up()
+t2 = time.perf_counter()
+client = app.app.test_client()
+client.get("/")
+t3 = time.perf_counter()
+timings = {"import": t1 - t0, "warm_up": t2 - t1, "first_get": t3 - t2}
+if topic:
+    client.post("/", data={"topic": topic})
+    timings["first_post"] = time.perf_counter() - t3
+print(json.dumps(timings))
+"""
+
+
+def run_once(topic):
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, topic],
+        cwd=here,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--topic", default="", help="also time a first POST for this topic")
+    args = parser.parse_args()
+
+    runs = [run_once(args.topic) for _ in range(args.runs)]
+    print(f"{'phase':<12}{'median ms':>12}{'max ms':>12}")
+    for phase in runs[0]:
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<12}{statistics.median(values):>12.1f}{max(values):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
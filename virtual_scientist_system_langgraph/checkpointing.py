@@ -0,0 +1,227 @@
+"""Checkpoints graph state after every node so a failed run can be resumed instead of restarted.
+
+CHECKPOINT_BACKEND selects the LangGraph checkpointer: none (default), memory, sqlite
+(CHECKPOINT_PATH, needs langgraph-checkpoint-sqlite) or postgres (the DB_* settings from
+database.py, needs langgraph-checkpoint-postgres). Every run checkpoints under its own thread
+id, so concurrent requests for one topic never share state. When a run fails, its thread is
+recorded against the normalized topic; the next run for that topic claims the record and picks
+up after the last node that finished - e.g. only abstract_generation is re-run when it failed
+after S1-S3 succeeded. Checkpoints of runs that complete are deleted.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from text_utils import normalize_topic
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger("checkpointing")
+
+_checkpointer = None
+_registry = None
+_lock = threading.Lock()
+
+
+def create_checkpointer(name):
+    if name == "none":
+        return None
+    if name == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        return InMemorySaver()
+    if name == "sqlite":
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        conn = sqlite3.connect(os.getenv("CHECKPOINT_PATH", "checkpoints.sqlite3"), check_same_thread=False)
+        return SqliteSaver(conn)
+    if name == "postgres":
+        from psycopg.conninfo import make_conninfo
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+        from langgraph.checkpoint.postgres import PostgresSaver
+        from database import connection_settings
+
+        settings = {key: value for key, value in connection_settings().items() if value}
+        pool = ConnectionPool(
+            make_conninfo(**settings),
+            max_size=int(os.getenv("DB_POOL_MAX", "10")),
+            kwargs={'autocommit': True, 'prepare_threshold': 0, 'row_factory': dict_row},
+        )
+        saver = PostgresSaver(pool)
+        saver.setup()
+        return saver
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND '{name}'")
+
+
+def get_checkpointer():
+    """Returns the process-wide checkpointer selected by CHECKPOINT_BACKEND, or None when disabled."""
+    global _checkpointer
+    if _checkpointer is not None:
+        return _checkpointer
+
+    with _lock:
+        if _checkpointer is None:
+            _checkpointer = create_checkpointer(os.getenv("CHECKPOINT_BACKEND", "none"))
+    return _checkpointer
+
+
+class MemoryRunRegistry:
+    """Failed runs per topic key, for the in-process memory checkpointer."""
+
+    def __init__(self):
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def record(self, topic_key, thread):
+        with self.lock:
+            previous = self.runs.get(topic_key)
+            self.runs[topic_key] = thread
+        return previous if previous != thread else None
+
+    def claim(self, topic_key):
+        with self.lock:
+            return self.runs.pop(topic_key, None)
+
+
+class SQLiteRunRegistry:
+    """Failed runs per topic key, kept next to the SQLite checkpoints."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS graph_failed_runs (
+                topic_key TEXT PRIMARY KEY,
+                thread_id TEXT NOT NULL,
+                failed_at REAL
+            )
+        """)
+
+    def record(self, topic_key, thread):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                previous = self.conn.execute(
+                    "SELECT thread_id FROM graph_failed_runs WHERE topic_key = ?", (topic_key,)
+                ).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO graph_failed_runs (topic_key, thread_id, failed_at) VALUES (?, ?, ?)",
+                    (topic_key, thread, time.time()),
+                )
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        return previous[0] if previous and previous[0] != thread else None
+
+    def claim(self, topic_key):
+        with self.lock:
+            row = self.conn.execute(
+                "DELETE FROM graph_failed_runs WHERE topic_key = ? RETURNING thread_id", (topic_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+
+class PostgresRunRegistry:
+    """Failed runs per topic key in the research database via database.py."""
+
+    def __init__(self):
+        import database
+
+        self.database = database
+        database.create_failed_runs_table()
+
+    def record(self, topic_key, thread):
+        return self.database.record_failed_run(topic_key, thread)
+
+    def claim(self, topic_key):
+        return self.database.claim_failed_run(topic_key)
+
+
+def create_run_registry(name):
+    if name == "memory":
+        return MemoryRunRegistry()
+    if name == "sqlite":
+        return SQLiteRunRegistry(os.getenv("CHECKPOINT_PATH", "checkpoints.sqlite3"))
+    if name == "postgres":
+        return PostgresRunRegistry()
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND '{name}'")
+
+
+def get_run_registry():
+    """Returns the failed-run registry matching CHECKPOINT_BACKEND."""
+    global _registry
+    if _registry is not None:
+        return _registry
+
+    with _lock:
+        if _registry is None:
+            _registry = create_run_registry(os.getenv("CHECKPOINT_BACKEND", "none"))
+    return _registry
+
+
+def topic_key(topic):
+    return "abstract-" + hashlib.sha256(normalize_topic(topic).encode("utf-8")).hexdigest()[:32]
+
+
+def _config(thread):
+    return {'configurable': {'thread_id': thread}}
+
+
+def _resume_args(graph, state, topic):
+    """Returns (input, config) for a run: None as input resumes the topic's last failed run, if any."""
+    if graph.checkpointer is None:
+        return state, None
+    resumed = get_run_registry().claim(topic_key(topic))
+    if resumed is not None:
+        config = _config(resumed)
+        if graph.get_state(config).next:
+            logger.info("Resuming the interrupted run for the topic %r", topic)
+            return None, config
+        _forget(graph, config)
+    return state, _config(f"{topic_key(topic)}-{uuid.uuid4().hex}")
+
+
+def _forget(graph, config):
+    if config is not None:
+        graph.checkpointer.delete_thread(config['configurable']['thread_id'])
+
+
+def _remember_failure(graph, config, topic):
+    """Records the run's thread so the next run for the topic resumes it; drops the thread it replaces."""
+    if config is None:
+        return
+    try:
+        replaced = get_run_registry().record(topic_key(topic), config['configurable']['thread_id'])
+        if replaced is not None:
+            _forget(graph, _config(replaced))
+    except Exception:
+        logger.exception("Failed to record the interrupted run for the topic %r", topic)
+
+
+def invoke(graph, state, topic):
+    """Runs `graph` for `topic`, resuming the topic's last failed run when there is one."""
+    graph_input, config = _resume_args(graph, state, topic)
+    try:
+        result = graph.invoke(graph_input, config)
+    except BaseException:
+        _remember_failure(graph, config, topic)
+        raise
+    _forget(graph, config)
+    return result
+
+
+def stream(graph, state, topic, **kwargs):
+    """Streaming counterpart of invoke(); a stream closed before the end also counts as interrupted."""
+    graph_input, config = _resume_args(graph, state, topic)
+    try:
+        yield from graph.stream(graph_input, config, **kwargs)
+    except BaseException:
+        _remember_failure(graph, config, topic)
+        raise
+    _forget(graph, config)
@@ -0,0 +1,120 @@
+"""Fits the scientists' findings into a token budget before they go into the abstract prompt.
+
+Trimming is extractive and needs no extra LLM call: sentences repeated across scientists are
+dropped, then each scientist's remaining sentences are ranked by how central they are to that
+scientist's own text and the best ones are kept, in their original order, up to the budget.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+STOPWORDS = frozenset("""
+a about above after again all also an and any are as at be because been before being below
+between both but by can could did do does doing during each few for from further had has have
+having he her here hers him his how i if in into is it its itself just me more most my no nor
+not of off on once only or other our out over own same she should so some such than that the
+their them then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your
+""".split())
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"[a-z0-9]+")
+
+DEFAULT_BUDGETS = {"S1": 1200, "S2": 700, "S3": 300}
+
+
+def count_tokens(text):
+    """Approximates the Llama tokenizer: one token per word or symbol, at least one per four characters."""
+    return max(len(_TOKEN.findall(text)), len(text) // 4)
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def _terms(sentence):
+    return [word for word in _WORD.findall(sentence.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _rank(sentences, topic_terms):
+    """Scores sentences by overlap with the text's term distribution, favouring topic terms and early sentences."""
+    terms = [_terms(sentence) for sentence in sentences]
+    frequencies = Counter(term for sentence_terms in terms for term in set(sentence_terms))
+    scores = []
+    for position, sentence_terms in enumerate(terms):
+        unique = set(sentence_terms)
+        if not unique:
+            scores.append(0.0)
+            continue
+        centrality = sum(frequencies[term] for term in unique) / math.sqrt(len(unique))
+        topical = len(unique & topic_terms)
+        scores.append(centrality * (1 + 0.5 * topical) / (1 + 0.05 * position))
+    return scores
+
+
+def fit_to_budget(sentences, budget, topic_terms):
+    """Keeps the highest-ranked sentences that fit in `budget` tokens, in their original order."""
+    if sum(count_tokens(sentence) for sentence in sentences) <= budget:
+        return sentences
+
+    scores = _rank(sentences, topic_terms)
+    kept, used = set(), 0
+    for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        cost = count_tokens(sentences[index])
+        if used + cost <= budget:
+            kept.add(index)
+            used += cost
+    return [sentence for index, sentence in enumerate(sentences) if index in kept]
+
+
+def budget_for(name):
+    return int(os.getenv(f"ABSTRACT_BUDGET_{name}", str(DEFAULT_BUDGETS.get(name, 500))))
+
+
+def build_context(topic, responses, duplicate_threshold=0.6):
+    """Returns {scientist: trimmed text} with cross-scientist duplicates removed and each within its budget.
+
+    `responses` maps scientist names ("S1", "S2", ...) to their full responses, in priority order:
+    when two scientists say the same thing, the earlier one keeps the sentence.
+    """
+    topic_terms = set(_terms(topic))
+    seen = []
+    trimmed = {}
+    for name, text in responses.items():
+        unique = []
+        for sentence in split_sentences(text or ""):
+            terms = set(_terms(sentence))
+            if any(_similarity(terms, other) >= duplicate_threshold for other in seen):
+                continue
+            seen.append(terms)
+            unique.append(sentence)
+        trimmed[name] = "\n".join(fit_to_budget(unique, budget_for(name), topic_terms))
+    return trimmed
+
+
+def abstract_prompt(state):
+    """Renders the final-abstract prompt from the budgeted S1-S3 findings in `state`."""
+    from prompt_registry import get_prompt
+
+    findings = build_context(state['topic'], {
+        'S1': state['s1_response'],
+        'S2': state['s2_response'],
+        'S3': state['s3_response'],
+    })
+    # Scientists that missed their deadline are named so the summary leaves their part out
+    for name in state.get('missing_sections', ()):
+        if name in findings:
+            findings[name] = get_prompt("missing_section").render(SCIENTIST=name)
+    return get_prompt("final").render(
+        S1_FINDINGS=findings['S1'],
+        S2_FINDINGS=findings['S2'],
+        S3_FINDINGS=findings['S3'],
+    )
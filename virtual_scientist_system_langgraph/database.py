@@ -1,47 +1,431 @@
-import psycopg2
+import atexit
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import os
+from text_utils import normalize_topic
+from log_config import get_logger
 
 load_dotenv()
 
-def connect_db():
-    """Establishes a connection to PostgreSQL."""
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),  
-        user=os.getenv("DB_USER"), 
-        password=os.getenv("DB_PASS"), 
-        host=os.getenv("DB_HOST"), 
+logger = get_logger("database")
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def connection_settings():
+    return dict(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASS"),
+        host=os.getenv("DB_HOST"),
         port=os.getenv("DB_PORT")
     )
+
+def connect_db():
+    """Establishes a connection to PostgreSQL."""
+    import psycopg2
+
+    conn = psycopg2.connect(**connection_settings())
     return conn
 
+def get_pool():
+    """Returns the process-wide connection pool, sized by DB_POOL_MIN and DB_POOL_MAX."""
+    global _pool, _pool_slots
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+
+            max_connections = int(os.getenv("DB_POOL_MAX", "10"))
+            # ThreadedConnectionPool raises when exhausted, so callers wait on a semaphore instead
+            _pool_slots = threading.BoundedSemaphore(max_connections)
+            _pool = ThreadedConnectionPool(
+                int(os.getenv("DB_POOL_MIN", "1")),
+                max_connections,
+                **connection_settings()
+            )
+    return _pool
+
+@contextmanager
+def pooled_connection():
+    """Borrows a pooled connection, committing on success and rolling back on error.
+
+    Waits up to DB_POOL_WAIT_SECONDS for a free connection before raising PoolError.
+    """
+    from psycopg2.pool import PoolError
+
+    pool = get_pool()
+    if not _pool_slots.acquire(timeout=float(os.getenv("DB_POOL_WAIT_SECONDS", "30"))):
+        raise PoolError("Timed out waiting for a pooled database connection")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=conn.closed != 0)
+        _pool_slots.release()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
 def create_table():
     """Creates the necessary table to store query and response data if it doesn't exist."""
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS research_chat_history (
-            id SERIAL PRIMARY KEY,
-            topic VARCHAR(255),          -- Name of the topic
-            abstract TEXT,               -- Final generated abstract
-            timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS research_chat_history (
+                id SERIAL PRIMARY KEY,
+                topic VARCHAR(255),          -- Name of the topic
+                abstract TEXT,               -- Final generated abstract
+                timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        cursor.execute("""
+            ALTER TABLE research_chat_history
+            ADD COLUMN IF NOT EXISTS topic_normalized VARCHAR(255);
+        """)
+        # Backfill rows written before the column existed
+        cursor.execute("""
+            UPDATE research_chat_history
+            SET topic_normalized = lower(regexp_replace(btrim(topic), '\\s+', ' ', 'g'))
+            WHERE topic_normalized IS NULL;
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS research_chat_history_topic_normalized_idx
+            ON research_chat_history (topic_normalized, timestamp DESC);
+        """)
+
+def ensure_schema():
+    """Runs create_table once per process; safe to call before every read or write."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if not _schema_ready:
+            create_table()
+            _schema_ready = True
+
+def store_query_responses(rows):
+    """Inserts many (topic, abstract) pairs in a single round trip."""
+    from psycopg2.extras import execute_values
+
+    ensure_schema()
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        execute_values(
+            cursor,
+            "INSERT INTO research_chat_history (topic, topic_normalized, abstract) VALUES %s",
+            [(topic, normalize_topic(topic), abstract) for topic, abstract in rows],
+        )
+
+def is_transient_error(error):
+    """Connection-level failures worth retrying; anything else is treated as a problem with the rows."""
+    from psycopg2 import InterfaceError, OperationalError
+    from psycopg2.pool import PoolError
+
+    return isinstance(error, (OperationalError, InterfaceError, PoolError))
+
+class WriteBehindQueue:
+    """Buffers inserts on a background thread and flushes them in batches by size, age or at shutdown.
+
+    A batch that fails with a transient error is retried with exponential backoff; one that fails
+    for any other reason is written row by row, so a single bad row only loses itself.
+    """
+
+    def __init__(self, write_batch, batch_size=50, flush_interval=1.0, retries=3, retry_backoff=0.5,
+                 is_transient=is_transient_error):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.is_transient = is_transient
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self.thread.start()
+
+    def put(self, row):
+        self.pending.put(row)
+
+    def flush(self):
+        """Blocks until every row queued so far has been written."""
+        self.pending.join()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def _write(self, batch):
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                self.write_batch(batch)
+                return
+            except Exception as e:
+                error = e
+            if not self.is_transient(error) or attempt == self.retries:
+                break
+            time.sleep(delay)
+            delay *= 2
+
+        if self.is_transient(error) or len(batch) == 1:
+            logger.error("Failed to write %d queued rows: %s", len(batch), error)
+            return
+        for row in batch:
+            try:
+                self.write_batch([row])
+            except Exception as e:
+                logger.error("Failed to write a queued row: %s", e)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Returns the research_chat_history write-behind queue, tuned by DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL and DB_WRITE_RETRIES."""
+    global _writer
+    if _writer is not None:
+        return _writer
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(
+                store_query_responses,
+                batch_size=int(os.getenv("DB_WRITE_BATCH_SIZE", "50")),
+                flush_interval=float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "1.0")),
+                retries=int(os.getenv("DB_WRITE_RETRIES", "3")),
+                retry_backoff=float(os.getenv("DB_WRITE_RETRY_BACKOFF", "0.5")),
+            )
+            atexit.register(_writer.flush)
+    return _writer
+
+def flush_writes():
+    """Waits for queued inserts to reach the database."""
+    if _writer is not None:
+        _writer.flush()
+
+def history_enabled():
+    """DB_ENABLED=0 runs without research_chat_history, e.g. for offline benchmarks."""
+    return os.getenv("DB_ENABLED", "1") != "0"
 
 def store_query_response(topic, abstract):
-    """Stores the query (topic) and the response (abstract) in the database."""
-    conn = connect_db()
-    cursor = conn.cursor()
+    """Stores the query (topic) and the response (abstract) in the database.
+
+    Rows are queued and written in the background unless DB_WRITE_BEHIND=0.
+    """
+    if not history_enabled():
+        return
+    if os.getenv("DB_WRITE_BEHIND", "1") == "0":
+        store_query_responses([(topic, abstract)])
+    else:
+        get_writer().put((topic, abstract))
+
+def fetch_stored_abstract(topic, max_age_seconds=None):
+    """Returns the most recent stored abstract for `topic`, or None if there is none within `max_age_seconds`."""
+    if not history_enabled():
+        return None
     query = """
-        INSERT INTO research_chat_history (topic, abstract)
-        VALUES (%s, %s);
+        SELECT abstract FROM research_chat_history
+        WHERE topic_normalized = %s AND abstract <> ''
     """
-    cursor.execute(query, (topic, abstract))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    params = [normalize_topic(topic)]
+    if max_age_seconds:
+        query += " AND timestamp > NOW() - make_interval(secs => %s)"
+        params.append(max_age_seconds)
+    query += " ORDER BY timestamp DESC LIMIT 1;"
+    ensure_schema()
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def fetch_stored_topics():
+    """Yields one topic per normalized topic that has a stored abstract, e.g. to rebuild the topic index."""
+    ensure_schema()
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT ON (topic_normalized) topic FROM research_chat_history
+            WHERE abstract <> '' ORDER BY topic_normalized, timestamp DESC;
+        """)
+        rows = cursor.fetchall()
+    for (topic,) in rows:
+        yield topic
+
+def create_llm_cache_table():
+    """Creates the table backing the Postgres LLM response cache if it doesn't exist."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                cache_key CHAR(64) PRIMARY KEY,
+                response TEXT,
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+def fetch_cached_completion(cache_key, max_age_seconds=None):
+    """Returns the cached response for `cache_key`, or None if missing or older than `max_age_seconds`."""
+    query = "SELECT response FROM llm_response_cache WHERE cache_key = %s"
+    params = [cache_key]
+    if max_age_seconds:
+        query += " AND created_at > NOW() - make_interval(secs => %s)"
+        params.append(max_age_seconds)
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def store_cached_completion(cache_key, response):
+    """Inserts or refreshes the cached response for `cache_key`."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO llm_response_cache (cache_key, response)
+            VALUES (%s, %s)
+            ON CONFLICT (cache_key) DO UPDATE
+            SET response = EXCLUDED.response, created_at = CURRENT_TIMESTAMP;
+        """, (cache_key, response))
+
+JOB_COLUMNS = ("id", "topic", "status", "result", "error", "created_at", "updated_at")
+
+def create_jobs_table():
+    """Creates the research_jobs queue table; at most one pending/running job exists per normalized topic."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS research_jobs (
+                id CHAR(32) PRIMARY KEY,
+                topic TEXT NOT NULL,
+                topic_normalized TEXT NOT NULL,
+                status VARCHAR(10) NOT NULL DEFAULT 'pending',
+                result TEXT,
+                error TEXT,
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS research_jobs_active_topic
+                ON research_jobs (topic_normalized) WHERE status IN ('pending', 'running');
+            CREATE INDEX IF NOT EXISTS research_jobs_status_created
+                ON research_jobs (status, created_at);
+        """)
+
+def enqueue_job(job_id, topic):
+    """Queues `topic` as job `job_id` unless it is already pending or running; returns the job id that will run it."""
+    normalized = normalize_topic(topic)
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO research_jobs (id, topic, topic_normalized)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (topic_normalized) WHERE status IN ('pending', 'running') DO NOTHING
+            RETURNING id;
+        """, (job_id, topic, normalized))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("""
+                SELECT id FROM research_jobs
+                WHERE topic_normalized = %s AND status IN ('pending', 'running');
+            """, (normalized,))
+            row = cursor.fetchone()
+    # The active job may have finished in between; queue a fresh one in that case
+    return row[0] if row else enqueue_job(job_id, topic)
+
+def claim_job(stale_seconds):
+    """Marks the oldest pending job (or one whose worker went quiet for `stale_seconds`) as running and returns (id, topic)."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE research_jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM research_jobs
+                WHERE status = 'pending'
+                   OR (status = 'running' AND updated_at < NOW() - make_interval(secs => %s))
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, topic;
+        """, (stale_seconds,))
+        return cursor.fetchone()
+
+def finish_job(job_id, status, result=None, error=None):
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE research_jobs SET status = %s, result = %s, error = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s;
+        """, (status, result, error, job_id))
+
+def fetch_job(job_id):
+    """Returns the job as a dict with epoch timestamps, or None if unknown."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT id, topic, status, result, error,
+                   EXTRACT(EPOCH FROM created_at)::float8, EXTRACT(EPOCH FROM updated_at)::float8
+            FROM research_jobs WHERE id = %s;
+        """, (job_id,))
+        row = cursor.fetchone()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+def prune_jobs(max_age_seconds):
+    """Deletes finished jobs older than `max_age_seconds`."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM research_jobs
+            WHERE status IN ('done', 'failed') AND updated_at < NOW() - make_interval(secs => %s);
+        """, (max_age_seconds,))
+
+def create_failed_runs_table():
+    """Creates graph_failed_runs, which points each topic at the checkpoint thread of its last failed run."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS graph_failed_runs (
+                topic_key TEXT PRIMARY KEY,
+                thread_id TEXT NOT NULL,
+                failed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+def record_failed_run(topic_key, thread_id):
+    """Points `topic_key` at `thread_id`; returns the thread it replaced, if any."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT thread_id FROM graph_failed_runs WHERE topic_key = %s FOR UPDATE;", (topic_key,))
+        previous = cursor.fetchone()
+        cursor.execute("""
+            INSERT INTO graph_failed_runs (topic_key, thread_id) VALUES (%s, %s)
+            ON CONFLICT (topic_key) DO UPDATE SET thread_id = EXCLUDED.thread_id, failed_at = CURRENT_TIMESTAMP;
+        """, (topic_key, thread_id))
+    return previous[0] if previous and previous[0] != thread_id else None
 
-create_table()
+def claim_failed_run(topic_key):
+    """Removes and returns the failed run recorded for `topic_key`, so only one retry resumes it."""
+    with pooled_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM graph_failed_runs WHERE topic_key = %s RETURNING thread_id;", (topic_key,))
+        row = cursor.fetchone()
+    return row[0] if row else None
@@ -0,0 +1,206 @@
+"""Per-role deadlines and hedged requests for scientist calls.
+
+NODE_DEADLINE_SECONDS (or NODE_DEADLINE_<ROLE>, e.g. NODE_DEADLINE_S1) bounds how long a
+scientist call may take; a call that misses it raises DeadlineExceeded, and graph nodes wrapped
+with degrade_on_deadline() then report their section as missing instead of holding up the
+abstract. With HEDGE_ENABLED=1, a call still running after the role's recent p95 latency is
+duplicated and whichever copy answers first wins.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger("deadlines")
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, role, deadline):
+        super().__init__(f"{role} did not respond within {deadline:g}s")
+        self.role = role
+
+
+class LatencyTracker:
+    """Recent call durations per role, for the hedging threshold."""
+
+    def __init__(self, window=200, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def observe(self, role, seconds):
+        with self.lock:
+            self.samples.setdefault(role, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, role, fraction):
+        """Returns the `fraction` quantile of recent durations, or None until enough calls were seen."""
+        with self.lock:
+            samples = sorted(self.samples.get(role, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+_tracker = LatencyTracker(
+    window=int(os.getenv("HEDGE_WINDOW", "200")),
+    min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+)
+_executor = None
+_lock = threading.Lock()
+
+
+def deadline_for(role):
+    value = os.getenv(f"NODE_DEADLINE_{role.upper()}") or os.getenv("NODE_DEADLINE_SECONDS")
+    return float(value) if value else None
+
+
+def hedge_delay(role):
+    """Seconds after which a duplicate request is sent, or None when hedging is off or untrained."""
+    if os.getenv("HEDGE_ENABLED", "0") != "1":
+        return None
+    p95 = _tracker.quantile(role, float(os.getenv("HEDGE_QUANTILE", "0.95")))
+    if p95 is None:
+        return None
+    return max(p95, float(os.getenv("HEDGE_MIN_DELAY", "0.5")))
+
+
+def pool_size():
+    """HEDGE_POOL_SIZE, by default enough for every request thread's four scientist calls plus a hedge each.
+
+    Late and losing calls keep their thread until the LLM answers, so an undersized pool queues
+    new calls behind abandoned ones.
+    """
+    size = os.getenv("HEDGE_POOL_SIZE")
+    return int(size) if size else int(os.getenv("GUNICORN_THREADS", "32")) * 4 * 2
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=pool_size(), thread_name_prefix="scientist-call")
+    return _executor
+
+
+def _timed(role, fn):
+    started = time.perf_counter()
+    result = fn()
+    _tracker.observe(role, time.perf_counter() - started)
+    return result
+
+
+class _Attempt:
+    def __init__(self):
+        self.started = None
+        self.running = threading.Event()
+
+
+def _run_attempt(attempt, role, fn):
+    attempt.started = time.monotonic()
+    attempt.running.set()
+    return _timed(role, fn)
+
+
+def _submit(executor, role, fn):
+    # Each attempt gets its own copy of the caller's context, so trace and node ids follow the call
+    attempt = _Attempt()
+    return attempt, executor.submit(contextvars.copy_context().run, _run_attempt, attempt, role, fn)
+
+
+def call_with_deadline(role, fn):
+    """Runs `fn()` for `role` under its deadline, hedging it past the role's p95 when enabled.
+
+    A blocking call cannot be interrupted, so a call that loses the race or misses the deadline
+    finishes in the background and its result is discarded. The deadline and the hedge delay
+    count from when the first attempt starts running, not from when it was queued on the pool.
+    """
+    deadline = deadline_for(role)
+    delay = hedge_delay(role)
+    if deadline is None and delay is None:
+        return _timed(role, fn)
+
+    executor = _get_executor()
+    first, future = _submit(executor, role, fn)
+    pending = {future}
+    first.running.wait()
+    started = first.started
+    if delay is not None and (deadline is None or delay < deadline):
+        if not wait(pending, timeout=delay).done:
+            pending.add(_submit(executor, role, fn)[1])
+
+    while pending:
+        remaining = None if deadline is None else max(0.0, deadline - (time.monotonic() - started))
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(role, deadline)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            raise next(iter(done)).exception()
+
+
+async def _atimed(role, make_coro):
+    started = time.perf_counter()
+    result = await make_coro()
+    _tracker.observe(role, time.perf_counter() - started)
+    return result
+
+
+async def acall_with_deadline(role, make_coro):
+    """Async counterpart of call_with_deadline(); losing or late calls are cancelled."""
+    deadline = deadline_for(role)
+    delay = hedge_delay(role)
+    if deadline is None and delay is None:
+        return await _atimed(role, make_coro)
+
+    started = time.monotonic()
+    pending = {asyncio.ensure_future(_atimed(role, make_coro))}
+    try:
+        if delay is not None and (deadline is None or delay < deadline):
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                pending.add(asyncio.ensure_future(_atimed(role, make_coro)))
+
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - (time.monotonic() - started))
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(role, deadline)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not pending:
+                raise next(iter(done)).exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def degrade_on_deadline(role, key, fn):
+    """Wraps a scientist node so a missed deadline yields an empty `key` and marks `role` as missing."""
+    if asyncio.iscoroutinefunction(fn):
+        async def wrapper(state):
+            try:
+                return await fn(state)
+            except DeadlineExceeded as e:
+                logger.warning("%s; continuing without its findings", e)
+                return {key: '', 'missing_sections': [role]}
+    else:
+        def wrapper(state):
+            try:
+                return fn(state)
+            except DeadlineExceeded as e:
+                logger.warning("%s; continuing without its findings", e)
+                return {key: '', 'missing_sections': [role]}
+    wrapper.__name__ = getattr(fn, "__name__", role)
+    return wrapper
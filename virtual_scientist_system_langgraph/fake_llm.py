@@ -0,0 +1,117 @@
+"""Deterministic stand-ins for the Groq clients, for benchmarks and offline runs.
+
+They expose the same `chat.completions.create(...)` surface the graph uses, including
+streaming and usage reporting, and simulate network latency plus a token generation rate.
+"""
+import asyncio
+import hashlib
+import random
+import time
+from types import SimpleNamespace
+
+WORDS = (
+    "research method results analysis model data study approach evidence system "
+    "performance experiment theory framework impact application insight novel"
+).split()
+
+
+class LatencyModel:
+    """Time-to-first-token drawn from a seeded distribution, plus completion tokens at a fixed rate."""
+
+    def __init__(self, distribution="lognormal", median=0.2, sigma=0.3, tokens_per_second=400.0,
+                 completion_tokens=200, seed=0):
+        self.distribution = distribution
+        self.median = median
+        self.sigma = sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.random = random.Random(seed)
+
+    def first_token_delay(self):
+        if self.distribution == "fixed":
+            return self.median
+        if self.distribution == "uniform":
+            return self.random.uniform(0, 2 * self.median)
+        return self.random.lognormvariate(0, self.sigma) * self.median
+
+    def token_count(self, max_tokens):
+        return min(max_tokens or self.completion_tokens, self.completion_tokens)
+
+
+def _text_for(params, count):
+    seed = hashlib.sha256(repr(params.get("messages")).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    return [rng.choice(WORDS) + " " for _ in range(count)]
+
+
+def _usage(params, count):
+    prompt_tokens = sum(len(message["content"]) for message in params["messages"]) // 4
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=count,
+                           total_tokens=prompt_tokens + count)
+
+
+def _completion(text, usage):
+    message = SimpleNamespace(content=text, role="assistant")
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+
+def _chunk(token, usage=None):
+    delta = SimpleNamespace(content=token)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None,
+                           x_groq=SimpleNamespace(usage=usage) if usage else None)
+
+
+class _Completions:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **params):
+        count = self.latency.token_count(params.get("max_tokens"))
+        tokens = _text_for(params, count)
+        usage = _usage(params, count)
+        time.sleep(self.latency.first_token_delay())
+        if params.get("stream"):
+            return self._stream(tokens, usage)
+        time.sleep(count / self.latency.tokens_per_second)
+        return _completion("".join(tokens), usage)
+
+    def _stream(self, tokens, usage):
+        delay = 1.0 / self.latency.tokens_per_second
+        for token in tokens:
+            time.sleep(delay)
+            yield _chunk(token)
+        yield _chunk("", usage)
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **params):
+        count = self.latency.token_count(params.get("max_tokens"))
+        tokens = _text_for(params, count)
+        usage = _usage(params, count)
+        await asyncio.sleep(self.latency.first_token_delay())
+        if params.get("stream"):
+            return self._astream(tokens, usage)
+        await asyncio.sleep(count / self.latency.tokens_per_second)
+        return _completion("".join(tokens), usage)
+
+    async def _astream(self, tokens, usage):
+        # Sleep per batch of tokens so the simulated rate holds without flooding the loop with timers
+        batch = max(1, int(self.latency.tokens_per_second // 50))
+        for start in range(0, len(tokens), batch):
+            await asyncio.sleep(batch / self.latency.tokens_per_second)
+            for token in tokens[start:start + batch]:
+                yield _chunk(token)
+        yield _chunk("", usage)
+
+
+class FakeGroq:
+    def __init__(self, latency=None):
+        self.chat = SimpleNamespace(completions=_Completions(latency or LatencyModel()))
+
+    def close(self):
+        pass
+
+
+class FakeAsyncGroq:
+    def __init__(self, latency=None):
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(latency or LatencyModel()))
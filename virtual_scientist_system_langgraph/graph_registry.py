@@ -0,0 +1,63 @@
+import importlib
+import threading
+
+_builders = {}
+_checkpointed = set()
+_compiled = {}
+_lock = threading.Lock()
+
+# Modules whose first import is slow enough to show up on the first request.
+WARM_UP_MODULES = ("groq", "psycopg2", "langgraph.graph")
+
+
+def register_graph(name, builder, checkpointed=False):
+    """Registers a function returning an uncompiled StateGraph under `name`.
+
+    Checkpointed graphs are compiled with the CHECKPOINT_BACKEND checkpointer, if one is configured.
+    """
+    with _lock:
+        _builders[name] = builder
+        if checkpointed:
+            _checkpointed.add(name)
+        else:
+            _checkpointed.discard(name)
+        _compiled.pop(name, None)
+
+
+def get_graph(name="default"):
+    """Returns the compiled graph for `name`, building it on first use."""
+    graph = _compiled.get(name)
+    if graph is not None:
+        return graph
+
+    with _lock:
+        graph = _compiled.get(name)
+        if graph is None:
+            if name not in _builders:
+                raise KeyError(f"No graph registered under '{name}'")
+            checkpointer = None
+            if name in _checkpointed:
+                from checkpointing import get_checkpointer
+
+                checkpointer = get_checkpointer()
+            graph = _builders[name]().compile(checkpointer=checkpointer)
+            _compiled[name] = graph
+    return graph
+
+
+def registered_graphs():
+    """Returns the names of all registered graph variants."""
+    with _lock:
+        return sorted(_builders)
+
+
+def warm_up(names=None):
+    """Imports heavy dependencies and compiles the given (or all) graphs ahead of the first request."""
+    for module in WARM_UP_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    for name in names or registered_graphs():
+        get_graph(name)
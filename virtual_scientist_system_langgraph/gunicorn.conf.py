@@ -0,0 +1,46 @@
+"""Gunicorn settings for serving app.py, overridable through GUNICORN_* environment variables.
+
+The default gthread workers give each in-flight topic its own thread, so capacity per box is
+roughly GUNICORN_WORKERS * GUNICORN_THREADS concurrent requests; GUNICORN_WORKER_CLASS=gevent
+(with gevent installed) trades threads for greenlets. Set GRAPH_MODE=async to run all graphs of a
+worker on one event loop instead of a thread each.
+"""
+import os
+import signal
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+# With NODE_DEADLINE_SECONDS or HEDGE_ENABLED, sync scientist calls run on deadlines.py's pool,
+# sized from this by default (threads x 4 scientists x 2 for hedges) unless HEDGE_POOL_SIZE is set
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+# A graph run makes several sequential LLM calls, so allow well beyond a single call's timeout
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+# Part of graceful_timeout kept back from draining for flushing history writes before the arbiter kills the worker
+SHUTDOWN_RESERVE = float(os.getenv("GUNICORN_SHUTDOWN_RESERVE", "10"))
+
+
+def post_worker_init(worker):
+    """Fails /healthz as soon as the worker is asked to stop, before it finishes its open requests."""
+    from lifecycle import begin_drain
+
+    def handle_exit(sig, frame):
+        begin_drain()
+        worker.handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_exit)
+
+
+def worker_exit(server, worker):
+    """Waits for graph runs still in flight (e.g. streams on the async loop), then flushes history writes.
+
+    The worker has already spent part of graceful_timeout finishing its open requests, so only
+    what is left of it, minus SHUTDOWN_RESERVE, goes to draining.
+    """
+    from lifecycle import draining_for, shutdown
+
+    shutdown(max(0.0, graceful_timeout - draining_for() - SHUTDOWN_RESERVE))
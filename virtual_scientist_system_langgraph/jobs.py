@@ -0,0 +1,255 @@
+"""Background job queue so HTTP requests return before the graph finishes.
+
+POST /jobs queues a topic and returns its job id; a pool of worker threads claims jobs from
+the store and runs them; GET /jobs/<id> polls (or long-polls) for the result. A topic that is
+already pending or running is not queued twice - callers share the existing job. The queue
+lives in SQLite (JOB_BACKEND=sqlite, the default) or in the research database (postgres), so
+several server processes can share it.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from text_utils import normalize_topic
+from log_config import get_logger
+
+load_dotenv()
+
+logger = get_logger("jobs")
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+COLUMNS = ("id", "topic", "status", "result", "error", "created_at", "updated_at")
+
+
+class SQLiteJobStore:
+    """Job table in a local SQLite file, shared by all workers on the host."""
+
+    def __init__(self, path="jobs.sqlite3"):
+        self.lock = threading.Lock()
+        # Autocommit mode so claims can take the write lock up front with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS research_jobs (
+                id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                topic_normalized TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS research_jobs_active_topic
+                ON research_jobs (topic_normalized) WHERE status IN ('pending', 'running');
+            CREATE INDEX IF NOT EXISTS research_jobs_status_created
+                ON research_jobs (status, created_at);
+        """)
+
+    def _transaction(self, fn, *args):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, job_id, topic):
+        def insert():
+            normalized = normalize_topic(topic)
+            row = self.conn.execute(
+                "SELECT id FROM research_jobs WHERE topic_normalized = ? AND status IN ('pending', 'running')",
+                (normalized,),
+            ).fetchone()
+            if row:
+                return row[0]
+            now = time.time()
+            self.conn.execute(
+                "INSERT INTO research_jobs (id, topic, topic_normalized, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, topic, normalized, now, now),
+            )
+            return job_id
+
+        return self._transaction(insert)
+
+    def claim(self, stale_seconds):
+        def update():
+            now = time.time()
+            row = self.conn.execute("""
+                SELECT id, topic FROM research_jobs
+                WHERE status = 'pending' OR (status = 'running' AND updated_at < ?)
+                ORDER BY created_at LIMIT 1
+            """, (now - stale_seconds,)).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE research_jobs SET status = 'running', updated_at = ? WHERE id = ?", (now, row[0])
+                )
+            return row
+
+        return self._transaction(update)
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE research_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM research_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def prune(self, max_age_seconds):
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM research_jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - max_age_seconds,),
+            )
+
+
+class PostgresJobStore:
+    """Job table in the research database via database.py, shared by every host."""
+
+    def __init__(self):
+        import database
+
+        self.database = database
+        database.create_jobs_table()
+
+    def enqueue(self, job_id, topic):
+        return self.database.enqueue_job(job_id, topic)
+
+    def claim(self, stale_seconds):
+        return self.database.claim_job(stale_seconds)
+
+    def finish(self, job_id, status, result=None, error=None):
+        self.database.finish_job(job_id, status, result, error)
+
+    def get(self, job_id):
+        return self.database.fetch_job(job_id)
+
+    def prune(self, max_age_seconds):
+        self.database.prune_jobs(max_age_seconds)
+
+
+class JobQueue:
+    """Runs queued topics through `run` on a pool of daemon worker threads."""
+
+    def __init__(self, store, run, workers=4, poll_interval=1.0, stale_seconds=600, retention_seconds=86400):
+        self.store = store
+        self.run = run
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.retention_seconds = retention_seconds
+        self._changed = threading.Condition()
+        self._threads = []
+        self._started = False
+
+    def start(self):
+        with self._changed:
+            if self._started:
+                return
+            self._started = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, topic):
+        """Queues `topic` and returns the id of the job that will produce its abstract."""
+        self.start()
+        job_id = self.store.enqueue(uuid.uuid4().hex, topic)
+        with self._changed:
+            self._changed.notify_all()
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def wait(self, job_id, timeout):
+        """Returns the job once it has finished or `timeout` seconds have passed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in (DONE, FAILED) or remaining <= 0:
+                return job
+            # Local workers wake us on completion; the poll interval covers other processes
+            with self._changed:
+                self._changed.wait(min(remaining, self.poll_interval))
+
+    def _work(self):
+        from lifecycle import draining
+
+        last_prune = 0.0
+        while not draining():
+            try:
+                claimed = self.store.claim(self.stale_seconds)
+            except Exception as e:
+                logger.error("Failed to claim a job: %s", e)
+                claimed = None
+
+            if claimed is None:
+                if time.monotonic() - last_prune > self.retention_seconds / 24:
+                    last_prune = time.monotonic()
+                    try:
+                        self.store.prune(self.retention_seconds)
+                    except Exception as e:
+                        logger.error("Failed to prune finished jobs: %s", e)
+                with self._changed:
+                    self._changed.wait(self.poll_interval)
+                continue
+
+            job_id, topic = claimed
+            try:
+                self.store.finish(job_id, DONE, result=self.run(topic))
+            except Exception as e:
+                logger.error("Job %s for the topic %r failed: %s", job_id, topic, e)
+                self.store.finish(job_id, FAILED, error=str(e))
+            with self._changed:
+                self._changed.notify_all()
+
+
+def create_store(name):
+    if name == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_DB_PATH", "jobs.sqlite3"))
+    if name == "postgres":
+        return PostgresJobStore()
+    raise ValueError(f"Unknown JOB_BACKEND '{name}'")
+
+
+_queue = None
+_lock = threading.Lock()
+
+
+def get_job_queue(run):
+    """Returns the process-wide job queue, created with `run(topic) -> abstract` and started on first use.
+
+    Starting here rather than on the first submit() lets a restarted process pick up jobs that
+    were already queued.
+    """
+    global _queue
+    if _queue is not None:
+        return _queue
+
+    with _lock:
+        if _queue is None:
+            _queue = JobQueue(
+                create_store(os.getenv("JOB_BACKEND", "sqlite")),
+                run,
+                workers=int(os.getenv("JOB_WORKERS", "4")),
+                poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1.0")),
+                stale_seconds=int(os.getenv("JOB_STALE_SECONDS", "600")),
+                retention_seconds=int(os.getenv("JOB_RETENTION_SECONDS", "86400")),
+            )
+            _queue.start()
+    return _queue
@@ -0,0 +1,77 @@
+"""Tracks in-flight graph runs so a server process can drain them before it exits."""
+import threading
+import time
+from contextlib import contextmanager
+from log_config import get_logger
+
+logger = get_logger("lifecycle")
+
+_in_flight = 0
+_draining = False
+_drain_started = None
+_idle = threading.Condition()
+
+
+@contextmanager
+def track_run():
+    """Counts one graph run as in flight for as long as the block runs."""
+    global _in_flight
+    with _idle:
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _idle:
+            _in_flight -= 1
+            if _in_flight == 0:
+                _idle.notify_all()
+
+
+def in_flight():
+    return _in_flight
+
+
+def draining():
+    return _draining
+
+
+def begin_drain():
+    """Flags the process as shutting down; /healthz starts failing so no new work is routed here."""
+    global _draining, _drain_started
+    if _drain_started is None:
+        _drain_started = time.monotonic()
+    _draining = True
+
+
+def draining_for():
+    """Seconds since the process started draining, or 0 if it has not."""
+    return 0.0 if _drain_started is None else time.monotonic() - _drain_started
+
+
+def drain(timeout):
+    """Marks the process as draining and waits up to `timeout` seconds for running graphs; returns True if idle."""
+    begin_drain()
+    deadline = time.monotonic() + timeout
+    with _idle:
+        while _in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _idle.wait(remaining)
+    return True
+
+
+def shutdown(timeout):
+    """Drains in-flight graphs, then flushes queued history writes and closes shared clients and pools."""
+    from database import close_pool, flush_writes
+    from llm_backends import close_backends
+    from llm_client import close_clients
+
+    idle = drain(timeout)
+    if not idle:
+        logger.warning("Shutting down with %d graph run(s) still in flight", _in_flight)
+    flush_writes()
+    close_pool()
+    close_clients()
+    close_backends()
+    return idle
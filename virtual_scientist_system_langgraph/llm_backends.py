@@ -0,0 +1,257 @@
+"""Chat-completion backends, chosen per role (S0-S3 and ABSTRACT) through the environment.
+
+    LLM_BACKEND=groq|openai|fake      default backend (groq)
+    LLM_MODEL=llama3-8b-8192          default model
+    LLM_BACKEND_S3=openai             per-role overrides, e.g. run S3 on a local server
+    LLM_MODEL_S3=llama-3.2-1b-instruct
+    OPENAI_BASE_URL=http://localhost:8080/v1   OpenAI-compatible server (llama.cpp, vLLM, ...)
+    OPENAI_API_KEY, OPENAI_TIMEOUT, OPENAI_MAX_CONNECTIONS, and _<ROLE> variants of each
+
+Every backend hands out clients with the `chat.completions.create(...)` surface (sync, async and
+streaming) that llm_client.create_completion expects. Only Groq calls go through the shared
+Groq rate limiter; other servers apply their own queueing, and the OpenAI-compatible client
+caps in-flight requests with its connection pool.
+"""
+import asyncio
+import json
+import os
+import threading
+import weakref
+from types import SimpleNamespace
+from dotenv import load_dotenv
+import llm_client
+
+load_dotenv()
+
+DEFAULT_MODEL = "llama3-8b-8192"
+
+
+class BackendHTTPError(Exception):
+    """Non-2xx reply from an OpenAI-compatible server; carries status_code for the retry policy."""
+
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} from {response.request.url}: {response.text[:200]}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+def _usage(data):
+    if not data:
+        return None
+    return SimpleNamespace(
+        prompt_tokens=data.get("prompt_tokens"),
+        completion_tokens=data.get("completion_tokens"),
+        total_tokens=data.get("total_tokens"),
+    )
+
+
+def _completion(data):
+    choices = [
+        SimpleNamespace(
+            message=SimpleNamespace(content=(choice.get("message") or {}).get("content") or "", role="assistant"),
+            finish_reason=choice.get("finish_reason"),
+        )
+        for choice in data.get("choices", [])
+    ]
+    return SimpleNamespace(choices=choices, usage=_usage(data.get("usage")))
+
+
+def _chunk(data):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=(choice.get("delta") or {}).get("content")))
+               for choice in data.get("choices", [])] or [SimpleNamespace(delta=SimpleNamespace(content=None))]
+    return SimpleNamespace(choices=choices, usage=_usage(data.get("usage")))
+
+
+def _event_data(line):
+    """Returns the decoded JSON of one server-sent `data:` line, or None for anything else."""
+    if not line.startswith("data:"):
+        return None
+    payload = line[len("data:"):].strip()
+    if not payload or payload == "[DONE]":
+        return None
+    return json.loads(payload)
+
+
+class _Completions:
+    def __init__(self, http):
+        self.http = http
+
+    def create(self, **params):
+        if params.get("stream"):
+            return self._stream(params)
+        response = self.http.post("chat/completions", json=params)
+        if response.is_error:
+            raise BackendHTTPError(response)
+        return _completion(response.json())
+
+    def _stream(self, params):
+        with self.http.stream("POST", "chat/completions", json=params) as response:
+            if response.is_error:
+                response.read()
+                raise BackendHTTPError(response)
+            for line in response.iter_lines():
+                data = _event_data(line)
+                if data is not None:
+                    yield _chunk(data)
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, **params):
+        if params.get("stream"):
+            return self._astream(params)
+        response = await self.http.post("chat/completions", json=params)
+        if response.is_error:
+            raise BackendHTTPError(response)
+        return _completion(response.json())
+
+    async def _astream(self, params):
+        async with self.http.stream("POST", "chat/completions", json=params) as response:
+            if response.is_error:
+                await response.aread()
+                raise BackendHTTPError(response)
+            async for line in response.aiter_lines():
+                data = _event_data(line)
+                if data is not None:
+                    yield _chunk(data)
+
+
+class OpenAICompatibleClient:
+    """Minimal client for /chat/completions on an OpenAI-compatible server."""
+
+    rate_limited = False
+
+    def __init__(self, http, completions=_Completions):
+        self.http = http
+        self.chat = SimpleNamespace(completions=completions(http))
+
+    def close(self):
+        self.http.close()
+
+
+class Backend:
+    """A provider of chat-completion clients plus the model to request from it."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def client(self):
+        raise NotImplementedError
+
+    def async_client(self):
+        raise NotImplementedError
+
+
+class GroqBackend(Backend):
+    """The shared Groq clients from llm_client, subject to the Groq rate limiter."""
+
+    def client(self):
+        return llm_client.get_client()
+
+    def async_client(self):
+        return llm_client.get_async_client()
+
+
+class OpenAICompatibleBackend(Backend):
+    def __init__(self, model, base_url, api_key=None, timeout=120.0, max_connections=8):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/") + "/"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _http_options(self):
+        import httpx
+
+        return dict(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=self.max_connections),
+        )
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+
+                    self._client = OpenAICompatibleClient(httpx.Client(**self._http_options()))
+        return self._client
+
+    def async_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = OpenAICompatibleClient(
+                httpx.AsyncClient(**self._http_options()), _AsyncCompletions
+            )
+        return client
+
+
+class FakeBackend(Backend):
+    """In-process fake_llm model, for offline runs and tests."""
+
+    def __init__(self, model):
+        super().__init__(model)
+        from fake_llm import FakeAsyncGroq, FakeGroq
+
+        self._client = FakeGroq()
+        self._async_client = FakeAsyncGroq()
+        # Like other non-Groq backends these do not spend the Groq quota
+        self._client.rate_limited = self._async_client.rate_limited = False
+
+    def client(self):
+        return self._client
+
+    def async_client(self):
+        return self._async_client
+
+
+def _setting(name, role, default=None):
+    return os.getenv(f"{name}_{role}") or os.getenv(name) or default
+
+
+def create_backend(role):
+    kind = _setting("LLM_BACKEND", role, "groq")
+    model = _setting("LLM_MODEL", role, DEFAULT_MODEL)
+    if kind == "groq":
+        return GroqBackend(model)
+    if kind == "openai":
+        return OpenAICompatibleBackend(
+            model,
+            _setting("OPENAI_BASE_URL", role, "http://localhost:8080/v1"),
+            api_key=_setting("OPENAI_API_KEY", role),
+            timeout=float(_setting("OPENAI_TIMEOUT", role, "120")),
+            max_connections=int(_setting("OPENAI_MAX_CONNECTIONS", role, "8")),
+        )
+    if kind == "fake":
+        return FakeBackend(model)
+    raise ValueError(f"Unknown LLM_BACKEND '{kind}' for {role}")
+
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def get_backend(role):
+    """Returns the backend configured for `role` (S0, S1, S2, S3 or ABSTRACT)."""
+    backend = _backends.get(role)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(role)
+            if backend is None:
+                backend = _backends[role] = create_backend(role)
+    return backend
+
+
+def close_backends():
+    with _lock:
+        for backend in _backends.values():
+            if isinstance(backend, OpenAICompatibleBackend) and backend._client is not None:
+                backend._client.close()
+        _backends.clear()
@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from text_utils import normalize_topic
+from metrics import record_cache_lookup
+
+load_dotenv()
+
+
+def cache_key(topic, prompt, params):
+    """Builds a content-addressed key from the normalized topic, prompt hash and sampling settings."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps([
+        normalize_topic(topic),
+        prompt_hash,
+        params.get("model"),
+        params.get("temperature"),
+        params.get("max_tokens"),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU cache with a TTL and a bound on both entry count and total cached characters."""
+
+    local = True
+
+    def __init__(self, max_entries=1024, max_chars=8_000_000, ttl=3600):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if self.ttl and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.size += len(value)
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_chars):
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        value, _ = self.entries.pop(key)
+        self.size -= len(value)
+
+
+class SQLiteCache:
+    """On-disk cache in a local SQLite file, shared by all workers on the host."""
+
+    local = False
+
+    def __init__(self, path="llm_cache.sqlite3", ttl=86400):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                response TEXT,
+                created_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM llm_response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl and row[1] < time.time() - self.ttl):
+            return None
+        return row[0]
+
+    def set(self, key, value):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (cache_key, response, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self.conn.commit()
+
+
+class PostgresCache:
+    """Cache stored in the research database via database.py."""
+
+    local = False
+
+    def __init__(self, ttl=86400):
+        import database
+
+        self.ttl = ttl
+        self.database = database
+        database.create_llm_cache_table()
+
+    def get(self, key):
+        return self.database.fetch_cached_completion(key, self.ttl)
+
+    def set(self, key, value):
+        self.database.store_cached_completion(key, value)
+
+
+class ResponseCache:
+    """Front for a cache backend that counts hits and misses."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        record_cache_lookup(value is not None)
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    async def aget(self, key):
+        if self.backend.local:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, value):
+        if self.backend.local:
+            return self.set(key, value)
+        return await asyncio.to_thread(self.set, key, value)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class NullCache:
+    local = True
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def create_backend(name):
+    ttl = int(os.getenv("LLM_CACHE_TTL", "3600"))
+    if name == "memory":
+        return MemoryCache(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            max_chars=int(os.getenv("LLM_CACHE_MAX_CHARS", "8000000")),
+            ttl=ttl,
+        )
+    if name == "sqlite":
+        return SQLiteCache(os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"), ttl=ttl)
+    if name == "postgres":
+        return PostgresCache(ttl=ttl)
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown LLM_CACHE_BACKEND '{name}'")
+
+
+def get_cache():
+    """Returns the process-wide response cache selected by LLM_CACHE_BACKEND (memory, sqlite, postgres or none)."""
+    global _cache
+    if _cache is not None:
+        return _cache
+
+    with _lock:
+        if _cache is None:
+            _cache = ResponseCache(create_backend(os.getenv("LLM_CACHE_BACKEND", "memory")))
+    return _cache
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from dotenv import load_dotenv
+from rate_limit import get_governor, estimate_tokens
+from metrics import record_llm_call
+
+load_dotenv()
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_async_factory = None
+_lock = threading.Lock()
+
+
+def _http_settings():
+    """Reads connection pool and timeout settings for the Groq HTTP client."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("GROQ_TIMEOUT", "60")),
+        connect=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+    )
+    return limits, timeout
+
+
+def get_client():
+    """Returns the process-wide Groq client, creating it on first use."""
+    global _client
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is None:
+            import httpx
+            from groq import Groq
+
+            limits, timeout = _http_settings()
+            _client = Groq(
+                timeout=timeout,
+                max_retries=0,  # retries are handled by the rate_limit governor
+                http_client=httpx.Client(limits=limits, timeout=timeout),
+            )
+    return _client
+
+
+def get_async_client():
+    """Returns the AsyncGroq client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None and _async_factory is not None:
+        client = _async_clients[loop] = _async_factory()
+    if client is None:
+        import httpx
+        from groq import AsyncGroq
+
+        limits, timeout = _http_settings()
+        client = AsyncGroq(
+            timeout=timeout,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def install_clients(client, async_client_factory):
+    """Replaces the Groq clients, e.g. with fake_llm stand-ins for offline benchmarks."""
+    global _client, _async_factory
+    with _lock:
+        _client = client
+        _async_factory = async_client_factory
+        _async_clients.clear()
+
+
+def _chunk_usage(chunk):
+    # Groq reports streamed usage on the final chunk under x_groq; OpenAI-style servers use .usage
+    return getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+
+
+def _metered_stream(stream, started):
+    usage = None
+    try:
+        for chunk in stream:
+            usage = _chunk_usage(chunk) or usage
+            yield chunk
+    finally:
+        record_llm_call(time.perf_counter() - started, usage)
+
+
+async def _ametered_stream(stream, started):
+    usage = None
+    try:
+        async for chunk in stream:
+            usage = _chunk_usage(chunk) or usage
+            yield chunk
+    finally:
+        record_llm_call(time.perf_counter() - started, usage)
+
+
+def _governed(client):
+    # Clients for other providers set rate_limited = False to bypass the Groq quota
+    return getattr(client, "rate_limited", True)
+
+
+def create_completion(client, **params):
+    """Calls chat.completions.create under the shared rate limiter, concurrency cap and retry policy."""
+    def call():
+        started = time.perf_counter()
+        result = client.chat.completions.create(**params)
+        if params.get("stream"):
+            return _metered_stream(result, started)
+        record_llm_call(time.perf_counter() - started, getattr(result, "usage", None))
+        return result
+
+    if not _governed(client):
+        return call()
+    return get_governor().call(call, estimate_tokens(params))
+
+
+async def acreate_completion(client, **params):
+    """Async counterpart of create_completion."""
+    async def call():
+        started = time.perf_counter()
+        result = await client.chat.completions.create(**params)
+        if params.get("stream"):
+            return _ametered_stream(result, started)
+        record_llm_call(time.perf_counter() - started, getattr(result, "usage", None))
+        return result
+
+    if not _governed(client):
+        return await call()
+    return await get_governor().acall(call, estimate_tokens(params))
+
+
+def close_clients():
+    """Closes the shared sync client; async clients are released with their event loop."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
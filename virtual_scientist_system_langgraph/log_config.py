@@ -0,0 +1,140 @@
+"""Leveled, structured logging that never blocks a graph node on I/O.
+
+Loggers from get_logger() hand records to a bounded in-memory queue; a background listener
+thread formats and writes them to stderr. Messages are truncated to LOG_MAX_CHARS before they
+are queued, full LLM responses are only logged at DEBUG and then sampled by
+LOG_PAYLOAD_SAMPLE_RATE, and records are dropped rather than waited on when the queue is full.
+LOG_FORMAT=json emits one JSON object per line, tagged with the run's trace id and node.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from dotenv import load_dotenv
+from metrics import current_node, current_trace
+
+load_dotenv()
+
+ROOT = "scientist"
+# Pass as extra= on records whose message carries a whole LLM response
+PAYLOAD = {'payload': True}
+
+_listener = None
+_span_logger = None
+_lock = threading.Lock()
+
+
+class ContextFilter(logging.Filter):
+    """Truncates long messages, samples payload records and attaches the trace id and node."""
+
+    def __init__(self, max_chars, payload_sample_rate):
+        super().__init__()
+        self.max_chars = max_chars
+        self.payload_sample_rate = payload_sample_rate
+
+    def filter(self, record):
+        if getattr(record, "payload", False) and random.random() >= self.payload_sample_rate:
+            return False
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [{len(message)} chars]"
+        record.msg, record.args = message, None
+        record.trace_id = current_trace.get() or "-"
+        record.node = current_node.get() or "-"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Drops records instead of blocking when the listener falls behind."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'trace_id': getattr(record, "trace_id", None),
+            'node': getattr(record, "node", None),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def _formatter():
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        return JSONFormatter()
+    return logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(trace_id)s %(node)s] %(message)s")
+
+
+def configure_logging():
+    """Sets up the queue handler and its listener once per process."""
+    global _listener
+    if _listener is not None:
+        return
+
+    with _lock:
+        if _listener is not None:
+            return
+        records = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        handler = DroppingQueueHandler(records)
+        handler.addFilter(ContextFilter(
+            int(os.getenv("LOG_MAX_CHARS", "500")),
+            float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1")),
+        ))
+
+        output = logging.StreamHandler()
+        output.setFormatter(_formatter())
+        listener = logging.handlers.QueueListener(records, output)
+        listener.start()
+        atexit.register(listener.stop)
+
+        logger = logging.getLogger(ROOT)
+        logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        logger.addHandler(handler)
+        logger.propagate = False
+        _listener = listener
+
+
+def get_logger(name):
+    """Returns a logger under the 'scientist' namespace, configuring logging on first use."""
+    configure_logging()
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def get_span_logger():
+    """Logger for trace spans: JSON lines written verbatim by their own listener to TRACE_FILE or stderr."""
+    global _span_logger
+    if _span_logger is not None:
+        return _span_logger
+
+    with _lock:
+        if _span_logger is None:
+            records = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+            path = os.getenv("TRACE_FILE")
+            output = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler()
+            output.setFormatter(logging.Formatter("%(message)s"))
+            listener = logging.handlers.QueueListener(records, output)
+            listener.start()
+            atexit.register(listener.stop)
+
+            logger = logging.getLogger(f"{ROOT}.spans")
+            logger.setLevel(logging.INFO)
+            logger.addHandler(DroppingQueueHandler(records))
+            logger.propagate = False
+            _span_logger = logger
+    return _span_logger
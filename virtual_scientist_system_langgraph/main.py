@@ -1,13 +1,22 @@
+import argparse
 import asyncio
-from groq import Groq
-from prompts import S1_PROMPT, S2_PROMPT, S3_PROMPT, GROQ_FINAL_PROMPT, S0_START_PROMPT, S0_END_PROMPT
+import sys
+from llm_client import create_completion
+from llm_backends import get_backend
+from prompt_registry import get_prompt
+from context_builder import abstract_prompt
 from dotenv import load_dotenv
-from langgraph.graph import Graph, StateGraph, START, END
-from pydantic import BaseModel, Field
 from typing import TypedDict, List, Any
+from graph_registry import register_graph, get_graph, warm_up
+from batch import read_topics, run_batch
+from metrics import instrument_node
+import checkpointing
+from log_config import PAYLOAD, get_logger
 
 load_dotenv()
 
+logger = get_logger("cli")
+
 class ScientistState(TypedDict):
     topic: str
     s1_response: str
@@ -18,63 +27,57 @@ class ScientistState(TypedDict):
 
 # Define Scientist class
 class Scientist:
-    def __init__(self, name, agent, prompt):
+    def __init__(self, name, backend, prompt):
         self.name = name
-        self.agent = agent
+        self.backend = backend
         self.prompt = prompt
-        self.response = None
 
     def query_tool(self, topic):
-        print(f"{self.name} is querying the agent for the topic '{topic}'...")
-        # Use Groq's chat completion for querying (assuming it's synchronous)
-        completion = self.agent.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[{"role": "system", "content": self.prompt}, {"role": "user", "content": topic}],
+        logger.info("%s is querying the agent for the topic %r", self.name, topic)
+        # Use Groq's chat completion, rate limited and retried on throttling
+        completion = create_completion(
+            self.backend.client(),
+            model=self.backend.model,
+            messages=[{"role": "system", "content": self.prompt.render()}, {"role": "user", "content": topic}],
             temperature=1,
             max_tokens=1024,
             top_p=1,
             stream=False,  # Disable streaming for a direct response
             stop=None,
         )
-        self.response = completion.choices[0].message.content  # Access the response directly
-        print(f"Response from {self.name}: {self.response}")
-        return self.response
+        response = completion.choices[0].message.content  # Access the response directly
+        logger.debug("Response from %s: %s", self.name, response, extra=PAYLOAD)
+        return response
 
 # Define the task functions for each node in the workflow
 def start(state: ScientistState):
-    print("Starting the process...")
+    logger.info("Starting the process for the topic %r", state['topic'])
     return state
 
 def query_agent_s1(state: ScientistState):
-    groq_agent = Groq()
-    scientist_s1 = Scientist("S1", groq_agent, S1_PROMPT)
+    scientist_s1 = Scientist("S1", get_backend("S1"), get_prompt("S1"))
     response = scientist_s1.query_tool(state['topic'])
     return {'s1_response': response}
 
 def query_agent_s2(state: ScientistState):
-    groq_agent = Groq()
-    scientist_s2 = Scientist("S2", groq_agent, S2_PROMPT)
+    scientist_s2 = Scientist("S2", get_backend("S2"), get_prompt("S2"))
     response = scientist_s2.query_tool(state['topic'])
     return {'s2_response': response}
 
 def query_agent_s3(state: ScientistState):
-    groq_agent = Groq()
-    scientist_s3 = Scientist("S3", groq_agent, S3_PROMPT)
+    scientist_s3 = Scientist("S3", get_backend("S3"), get_prompt("S3"))
     response = scientist_s3.query_tool(state['topic'])
     return {'s3_response': response}
 
 def abstract_generation(state: ScientistState):
-    # Format the final abstract using the responses gathered from the scientists
-    final_abstract = GROQ_FINAL_PROMPT.format(
-        S1_FINDINGS=state['s1_response'],
-        S2_FINDINGS=state['s2_response'],
-        S3_FINDINGS=state['s3_response']
-    )
+    # Same budgeted, registry-rendered prompt as the Flask app
+    final_abstract = abstract_prompt(state)
 
     # Generate the final abstract with Groq
-    client = Groq()
-    completion = client.chat.completions.create(
-        model="llama3-8b-8192",  # Use the appropriate model
+    backend = get_backend("ABSTRACT")
+    completion = create_completion(
+        backend.client(),
+        model=backend.model,
         messages=[{"role": "system", "content": final_abstract}],
         temperature=0.7,
     )
@@ -84,15 +87,17 @@ def abstract_generation(state: ScientistState):
 
 # Define the graph and workflow
 def create_workflow():
+    from langgraph.graph import StateGraph, START, END
+
     # Create the state graph for managing the flow
     workflow = StateGraph(ScientistState)
 
     # Add nodes (functions) to the graph
     workflow.add_node("start", start)
-    workflow.add_node("query_s1", query_agent_s1)
-    workflow.add_node("query_s2", query_agent_s2)
-    workflow.add_node("query_s3", query_agent_s3)
-    workflow.add_node("abstract_generation", abstract_generation)
+    workflow.add_node("query_s1", instrument_node("query_s1", query_agent_s1))
+    workflow.add_node("query_s2", instrument_node("query_s2", query_agent_s2))
+    workflow.add_node("query_s3", instrument_node("query_s3", query_agent_s3))
+    workflow.add_node("abstract_generation", instrument_node("abstract_generation", abstract_generation))
 
     # Add edges to define the flow of tasks
     workflow.add_edge(START, "start")
@@ -118,7 +123,36 @@ def create_workflow():
 
     return workflow
 
+register_graph("cli", create_workflow, checkpointed=True)
+
+def new_state(topic):
+    return {
+        'topic': topic,
+        's1_response': '',
+        's2_response': '',
+        's3_response': '',
+        'final_abstract': '',
+        'additional_notes': ''
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate research abstracts interactively or in batch.")
+    parser.add_argument("--batch", metavar="FILE", help="read topics from a JSONL/CSV file ('-' for stdin) instead of prompting")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from the file extension, else jsonl)")
+    parser.add_argument("--output", default="-", help="JSONL file to append results to; existing topics are skipped (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=4, help="topics processed at once (default: 4)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    warm_up(["cli"])
+
+    if args.batch:
+        topics = read_topics(args.batch, args.format)
+        processed, skipped, failed = run_batch(get_graph("cli"), new_state, topics, args.output, max(1, args.concurrency))
+        print(f"Processed {processed} topics ({failed} failed), skipped {skipped} already completed.", file=sys.stderr)
+        return
+
     while True:
         # Get user input for the query
         topic = input("Enter the topic for query (or 'exit' to quit: ").strip()
@@ -131,22 +165,9 @@ def main():
             print("Error: Topic cannot be empty. Please enter a valid topic.")
             continue
 
-        # Initialize the workflow
-        workflow = create_workflow()
-
-        # Initialize the state object
-        state_obj = {
-            'topic': topic,
-            's1_response': '',
-            's2_response': '',
-            's3_response': '',
-            'final_abstract': '',
-            'additional_notes': ''
-        }
-
         # Execute the workflow
-        app = workflow.compile()
-        result = app.invoke(state_obj)
+        app = get_graph("cli")
+        result = checkpointing.invoke(app, new_state(topic), topic)
 
         # Print the final abstract
         print("Final Abstract:\n")
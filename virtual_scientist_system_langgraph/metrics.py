@@ -0,0 +1,205 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_lock = threading.Lock()
+_metrics = []
+
+current_node = contextvars.ContextVar("current_node", default="")
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        with _lock:
+            _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with _lock:
+            series = self.series.setdefault(key, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        bucket_labels = self.labels + ("le",)
+        for key, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series['buckets']):
+                lines.append(f"{self.name}_bucket{_label_text(bucket_labels, key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_label_text(bucket_labels, key + ('+Inf',))} {series['count']}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {series['count']}")
+        return lines
+
+
+NODE_DURATION = Histogram("scientist_node_duration_seconds", "Wall time spent in each graph node.", ["node"])
+NODE_ERRORS = Counter("scientist_node_errors_total", "Graph node failures by exception type.", ["node", "error"])
+LLM_DURATION = Histogram("scientist_llm_request_duration_seconds", "Latency of individual LLM calls.", ["node"])
+LLM_QUEUE_WAIT = Histogram(
+    "scientist_llm_queue_wait_seconds",
+    "Time LLM calls waited on the rate limiter and concurrency cap.",
+    ["node"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LLM_TOKENS = Counter("scientist_llm_tokens_total", "Prompt and completion tokens reported by the LLM.", ["node", "kind"])
+CACHE_LOOKUPS = Counter("scientist_llm_cache_lookups_total", "LLM response cache lookups.", ["result"])
+RUNS = Counter("scientist_graph_runs_total", "Completed graph runs by outcome.", ["outcome"])
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format."""
+    with _lock:
+        lines = []
+        for metric in _metrics:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def emit_span(span):
+    """Queues a JSON trace span when TRACE_SPANS=1; a log_config listener writes it to TRACE_FILE or stderr."""
+    if os.getenv("TRACE_SPANS", "0") != "1":
+        return
+    from log_config import get_span_logger  # log_config imports this module's context variables
+
+    get_span_logger().info(json.dumps(span))
+
+
+@contextmanager
+def trace_run(topic):
+    """Groups the spans of one topic's graph run under a shared trace id."""
+    trace_id = uuid.uuid4().hex
+    token = current_trace.set(trace_id)
+    started = time.time()
+    outcome = "ok"
+    try:
+        yield trace_id
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        current_trace.reset(token)
+        RUNS.inc(outcome=outcome)
+        emit_span({
+            'trace_id': trace_id,
+            'span': "run",
+            'topic': topic,
+            'start': started,
+            'duration': time.time() - started,
+            'outcome': outcome,
+        })
+
+
+def _finish_node(name, started, wall_start, error):
+    duration = time.perf_counter() - started
+    NODE_DURATION.observe(duration, node=name)
+    span = {
+        'trace_id': current_trace.get(),
+        'span': "node",
+        'node': name,
+        'start': wall_start,
+        'duration': duration,
+    }
+    if error is not None:
+        NODE_ERRORS.inc(node=name, error=type(error).__name__)
+        span['error'] = f"{type(error).__name__}: {error}"
+    emit_span(span)
+
+
+def instrument_node(name, fn):
+    """Wraps a graph node (sync or async) to record its wall time, errors and trace span."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(state):
+            token = current_node.set(name)
+            started, wall_start, error = time.perf_counter(), time.time(), None
+            try:
+                return await fn(state)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                _finish_node(name, started, wall_start, error)
+                current_node.reset(token)
+    else:
+        @functools.wraps(fn)
+        def wrapper(state):
+            token = current_node.set(name)
+            started, wall_start, error = time.perf_counter(), time.time(), None
+            try:
+                return fn(state)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                _finish_node(name, started, wall_start, error)
+                current_node.reset(token)
+    return wrapper
+
+
+def record_queue_wait(seconds):
+    LLM_QUEUE_WAIT.observe(seconds, node=current_node.get())
+
+
+def record_llm_call(duration, usage=None):
+    node = current_node.get()
+    LLM_DURATION.observe(duration, node=node)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, node=node, kind="prompt")
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, node=node, kind="completion")
+    emit_span({
+        'trace_id': current_trace.get(),
+        'span': "llm",
+        'node': node,
+        'duration': duration,
+        'prompt_tokens': getattr(usage, "prompt_tokens", None),
+        'completion_tokens': getattr(usage, "completion_tokens", None),
+    })
+
+
+def record_cache_lookup(hit):
+    CACHE_LOOKUPS.inc(result="hit" if hit else "miss")
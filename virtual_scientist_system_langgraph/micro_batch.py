@@ -0,0 +1,249 @@
+"""Opt-in micro-batching of scientist completions across concurrent topics.
+
+With MICRO_BATCH_WINDOW_MS > 0, the first call for a given prompt opens a batch and waits up to
+that long (or until MICRO_BATCH_MAX_SIZE calls have joined) before sending one JSON-mode
+completion that answers every topic in the batch. Answers are split back to their callers; any
+caller whose answer is missing or unparsable, or whose batch was rejected for a non-transient
+reason, falls back to its own individual completion.
+"""
+import asyncio
+import json
+import os
+import threading
+import weakref
+from dotenv import load_dotenv
+from llm_client import create_completion, acreate_completion
+from prompt_registry import get_prompt
+from rate_limit import is_retryable
+
+load_dotenv()
+
+_batcher = None
+_async_batchers = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def window_seconds():
+    return float(os.getenv("MICRO_BATCH_WINDOW_MS", "0")) / 1000
+
+
+def max_batch_size():
+    return int(os.getenv("MICRO_BATCH_MAX_SIZE", "4"))
+
+
+def batch_key(params):
+    """Calls can share a completion when everything but the user message matches."""
+    return (params["messages"][0]["content"], params.get("model"), params.get("temperature"),
+            params.get("max_tokens"), params.get("top_p"))
+
+
+def pack_params(items):
+    """Builds one JSON-mode completion request answering the user message of every item."""
+    base = items[0]
+    requests = [{"id": str(index), "input": params["messages"][1]["content"]}
+                for index, params in enumerate(items)]
+    max_tokens = base.get("max_tokens") or 1024
+    return dict(
+        base,
+        messages=[
+            {"role": "system", "content": base["messages"][0]["content"] + get_prompt("micro_batch").render()},
+            {"role": "user", "content": json.dumps(requests)},
+        ],
+        max_tokens=min(max_tokens * len(items), int(os.getenv("MICRO_BATCH_MAX_TOKENS", "6000"))),
+        response_format={"type": "json_object"},
+        stream=False,
+    )
+
+
+def unpack(content, count):
+    """Returns one answer per packed item, None where the model's JSON has no usable answer."""
+    try:
+        answers = json.loads(content)
+    except (TypeError, ValueError):
+        return [None] * count
+    if not isinstance(answers, dict):
+        return [None] * count
+    return [answer if isinstance(answer, str) and answer.strip() else None
+            for answer in (answers.get(str(index)) for index in range(count))]
+
+
+class _Pending:
+    def __init__(self, params, event):
+        self.params = params
+        self.answer = None
+        self.error = None
+        self.done = event()
+
+
+class _Batch:
+    def __init__(self, event):
+        self.items = []
+        self.full = event()
+
+
+def _fail(items, error):
+    """Hands a transient error to every member; on any other error members fall back to their own calls.
+
+    A packed request can be rejected where its parts would not be - e.g. a 4xx for the combined
+    context length, or a server without JSON mode - so only errors that would hit the individual
+    calls too are propagated.
+    """
+    if is_retryable(error):
+        for item in items:
+            item.error = error
+
+
+def _record(items, completion):
+    for item, answer in zip(items, unpack(completion.choices[0].message.content, len(items))):
+        item.answer = answer
+
+
+class MicroBatcher:
+    """Groups concurrent threads' completions by batch_key; the first caller of a batch sends it."""
+
+    def __init__(self, window, max_size):
+        self.window = window
+        self.max_size = max_size
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key, pending, event):
+        batch = self._open.get(key)
+        leader = batch is None
+        if leader:
+            batch = self._open[key] = _Batch(event)
+        batch.items.append(pending)
+        if len(batch.items) >= self.max_size:
+            del self._open[key]
+            batch.full.set()
+        return batch, leader
+
+    def _detach(self, key, batch):
+        if self._open.get(key) is batch:
+            del self._open[key]
+
+    def complete(self, client, params):
+        pending = _Pending(params, threading.Event)
+        key = batch_key(params)
+        with self._lock:
+            batch, leader = self._join(key, pending, threading.Event)
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                self._detach(key, batch)
+            self._send(client, batch.items)
+        pending.done.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        if pending.answer is None:
+            completion = create_completion(client, **params)
+            return completion.choices[0].message.content
+        return pending.answer
+
+    def _send(self, client, items):
+        try:
+            if len(items) > 1:
+                _record(items, create_completion(client, **pack_params([item.params for item in items])))
+        except Exception as e:
+            _fail(items, e)
+        finally:
+            for item in items:
+                item.done.set()
+
+
+class AsyncMicroBatcher(MicroBatcher):
+    """Event-loop counterpart of MicroBatcher; one instance per loop, so no lock is needed.
+
+    Each batch is sent by its own task rather than by its first caller, so a caller cancelled by
+    a deadline, a lost hedge or a request timeout never strands the others.
+    """
+
+    def __init__(self, window, max_size):
+        super().__init__(window, max_size)
+        self._tasks = set()
+
+    async def complete(self, client, params):
+        pending = _Pending(params, asyncio.Event)
+        key = batch_key(params)
+        batch, leader = self._join(key, pending, asyncio.Event)
+        if leader:
+            task = asyncio.ensure_future(self._dispatch(client, key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            await pending.done.wait()
+        except asyncio.CancelledError:
+            # Leave a batch that has not been sent yet so it does not pay for an unwanted answer
+            if self._open.get(key) is batch:
+                batch.items.remove(pending)
+            raise
+
+        if pending.error is not None:
+            raise pending.error
+        if pending.answer is None:
+            completion = await acreate_completion(client, **params)
+            return completion.choices[0].message.content
+        return pending.answer
+
+    async def _dispatch(self, client, key, batch):
+        try:
+            try:
+                await asyncio.wait_for(batch.full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            self._detach(key, batch)
+            await self._send(client, batch.items)
+        finally:
+            # If this task is cancelled first, members are released to make their own calls
+            self._detach(key, batch)
+            for item in batch.items:
+                item.done.set()
+
+    async def _send(self, client, items):
+        try:
+            if len(items) > 1:
+                _record(items, await acreate_completion(client, **pack_params([item.params for item in items])))
+        except Exception as e:
+            _fail(items, e)
+        finally:
+            for item in items:
+                item.done.set()
+
+
+def get_batcher():
+    """Returns the process-wide batcher, or None when MICRO_BATCH_WINDOW_MS is unset or 0."""
+    global _batcher
+    if window_seconds() <= 0:
+        return None
+    if _batcher is None:
+        with _lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(window_seconds(), max_batch_size())
+    return _batcher
+
+
+def get_async_batcher():
+    """Returns the batcher bound to the running event loop, or None when batching is off."""
+    if window_seconds() <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    batcher = _async_batchers.get(loop)
+    if batcher is None:
+        batcher = _async_batchers[loop] = AsyncMicroBatcher(window_seconds(), max_batch_size())
+    return batcher
+
+
+def complete(client, params):
+    """Returns the reply text for `params`, sharing a completion with concurrent callers when enabled."""
+    batcher = get_batcher()
+    if batcher is None:
+        return create_completion(client, **params).choices[0].message.content
+    return batcher.complete(client, params)
+
+
+async def acomplete(client, params):
+    batcher = get_async_batcher()
+    if batcher is None:
+        return (await acreate_completion(client, **params)).choices[0].message.content
+    return await batcher.complete(client, params)
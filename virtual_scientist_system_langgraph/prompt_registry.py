@@ -0,0 +1,77 @@
+"""Versioned prompt templates shared by the Flask app and the CLI.
+
+Templates are checked when they are registered - every placeholder must be a plain name and
+match the declared fields - and split into literal/field pieces once, so rendering is a join.
+Each scientist can run a different version, picked with PROMPT_VERSION_<NAME> (e.g.
+PROMPT_VERSION_S1=v2); otherwise the most recently registered version is used.
+"""
+import hashlib
+import os
+import string
+
+import prompts
+
+_templates = {}
+
+
+class PromptTemplate:
+    def __init__(self, name, text, version="v1", fields=None):
+        self.name = name
+        self.version = version
+        self.text = text
+        self.pieces = self._compile(text)
+        found = {field for _, field in self.pieces if field}
+        self.fields = frozenset(found if fields is None else fields)
+        if found != self.fields:
+            raise ValueError(
+                f"Prompt {name}@{version} declares {sorted(self.fields)} but uses {sorted(found)}"
+            )
+        self.hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def fingerprint(self):
+        """Stable identifier of this exact template, for cache keys and logs."""
+        return f"{self.name}@{self.version}:{self.hash}"
+
+    def _compile(self, text):
+        pieces = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(text):
+            if field is not None and (not field.isidentifier() or format_spec or conversion):
+                raise ValueError(f"Prompt {self.name}@{self.version} has an unsupported placeholder {{{field}}}")
+            pieces.append((literal, field))
+        return pieces
+
+    def render(self, **values):
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.fingerprint} is missing values for {sorted(missing)}")
+        return "".join(literal + (str(values[field]) if field else "") for literal, field in self.pieces)
+
+
+def register_prompt(name, text, version="v1", fields=None):
+    """Validates and registers `text` as `version` of prompt `name`."""
+    template = PromptTemplate(name, text, version, fields)
+    _templates.setdefault(name, {})[version] = template
+    return template
+
+
+def get_prompt(name):
+    """Returns the active version of prompt `name`."""
+    versions = _templates.get(name)
+    if not versions:
+        raise KeyError(f"No prompt registered under '{name}'")
+    version = os.getenv(f"PROMPT_VERSION_{name.upper()}")
+    if version is None:
+        return next(reversed(versions.values()))
+    if version not in versions:
+        raise KeyError(f"Prompt '{name}' has no version '{version}' (known: {sorted(versions)})")
+    return versions[version]
+
+
+register_prompt("S0", prompts.S0_START_PROMPT, fields=())
+register_prompt("S1", prompts.S1_PROMPT, fields=())
+register_prompt("S2", prompts.S2_PROMPT, fields=())
+register_prompt("S3", prompts.S3_PROMPT, fields=())
+register_prompt("final", prompts.GROQ_FINAL_PROMPT, fields=("S1_FINDINGS", "S2_FINDINGS", "S3_FINDINGS"))
+register_prompt("micro_batch", prompts.MICRO_BATCH_PROMPT, fields=())
+register_prompt("missing_section", prompts.MISSING_SECTION_PROMPT, fields=("SCIENTIST",))
@@ -41,13 +41,24 @@ I have reviewed the findings from all three scientists. Now, let's combine our i
 
 # Final Abstract Prompt: Combining the responses from S1, S2, and S3 into a final summary
 GROQ_FINAL_PROMPT = """
+You are a professional summarizer. Your task is to generate a concise and well-structured abstract by summarizing the below responses:
 
-You are a  professional summarizer. Your task is to generate a concise and well-structured abstract by summarizing the below responses:
-
-    1. Key insights from S1: {state['s1_response']}
-    2. Additional details provided by S2: {state['s2_response']}
-    3. Further perspectives shared by S3: {state['s3_response']}
-    4. Abstract should be only between 300-400 words. 
+    1. Key insights from S1: {S1_FINDINGS}
+    2. Additional details provided by S2: {S2_FINDINGS}
+    3. Further perspectives shared by S3: {S3_FINDINGS}
+    4. Abstract should be only between 300-400 words.
     5. STRICTLY provide only the abstract.
-    6. Strictly rely on the provided text, without external informatioin
+    6. Strictly rely on the provided text, without external information.
+    7. Your response should directly start with the abstract without any external metadata.
 """
+
+# Micro-batch Prompt: appended to a scientist's prompt when several topics share one completion
+MICRO_BATCH_PROMPT = """
+
+You will receive a JSON array of requests, each with an "id" and an "input".
+Answer every request independently, exactly as the instructions above ask for a single input.
+Reply with only a JSON object that maps each id to its complete answer as a string.
+"""
+
+# Missing Section Prompt: stands in for the findings of a scientist that missed its deadline
+MISSING_SECTION_PROMPT = "(not available - {SCIENTIST} did not respond in time; leave this aspect out rather than guessing)"
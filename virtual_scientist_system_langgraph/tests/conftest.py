@@ -0,0 +1,12 @@
+"""Puts the package's flat modules on sys.path and keeps tests offline."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["DB_ENABLED"] = "0"
+os.environ["LLM_CACHE_BACKEND"] = "none"
+os.environ["SEARCH_ENABLED"] = "0"
+os.environ["CHECKPOINT_BACKEND"] = "none"
+os.environ["LOG_LEVEL"] = "WARNING"
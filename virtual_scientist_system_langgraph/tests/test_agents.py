@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import llm_cache
+from agents import DuckDuckGoAgent
+
+
+class StubDuckDuckGo(BaseHTTPRequestHandler):
+    """Answers like the instant-answer API; the response for each query is taken from `server.answers`."""
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        query = parse_qs(urlsplit(self.path).query)['q'][0]
+        status, body = self.server.answers.get(query, (200, {}))
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def duckduckgo(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDuckDuckGo)
+    server.paths, server.answers = [], {}
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    monkeypatch.setenv("DUCKDUCKGO_API_URL", f"http://127.0.0.1:{server.server_port}/")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def both_paths(agent, topic):
+    """Results of query_sync() and query() for `topic`."""
+    return agent.query_sync(topic), asyncio.run(agent.query(topic))
+
+
+def test_topic_is_url_encoded(duckduckgo):
+    topic = "C++ & Rust: memory safety?"
+    duckduckgo.answers[topic] = (200, {'Abstract': "Ownership rules."})
+
+    assert DuckDuckGoAgent().query_sync(topic) == "Ownership rules."
+    assert asyncio.run(DuckDuckGoAgent().query(topic)) == "Ownership rules."
+    for path in duckduckgo.paths:
+        assert "q=C%2B%2B+%26+Rust%3A+memory+safety%3F" in path
+        assert "&format=json" in path
+
+
+def test_related_topics_are_used_without_an_abstract(duckduckgo):
+    related = [{'Text': f"Snippet {i}"} for i in range(7)] + [{'Name': "Category", 'Topics': []}]
+    duckduckgo.answers["graphene"] = (200, {'Abstract': "", 'RelatedTopics': related})
+    duckduckgo.answers["nothing"] = (200, {'Abstract': "", 'RelatedTopics': []})
+
+    expected = "\n".join(f"Snippet {i}" for i in range(5))
+    assert DuckDuckGoAgent().query_sync("graphene") == expected
+    assert asyncio.run(DuckDuckGoAgent().query("graphene")) == expected
+    assert both_paths(DuckDuckGoAgent(), "nothing") == ('No result found', 'No result found')
+
+
+def test_errors_are_not_cached(duckduckgo):
+    agent = DuckDuckGoAgent()
+    duckduckgo.answers["superconductors"] = (503, {})
+    for result in both_paths(agent, "superconductors"):
+        assert result.startswith("Error querying DuckDuckGo")
+
+    duckduckgo.answers["superconductors"] = (200, {'Abstract': "Zero resistance."})
+    assert both_paths(agent, "superconductors") == ("Zero resistance.", "Zero resistance.")
+    assert len(duckduckgo.paths) == 3  # the first success is cached for the async call
+
+
+def test_results_are_cached_until_the_ttl_expires(duckduckgo, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setenv("DUCKDUCKGO_CACHE_TTL", "60")
+    agent = DuckDuckGoAgent()
+    duckduckgo.answers["perovskite solar cells"] = (200, {'Abstract': "First answer."})
+
+    assert agent.query_sync("perovskite solar cells") == "First answer."
+    duckduckgo.answers["perovskite solar cells"] = (200, {'Abstract': "Second answer."})
+    clock.now += 59
+    assert both_paths(agent, "Perovskite  solar cells") == ("First answer.", "First answer.")
+    assert len(duckduckgo.paths) == 1
+
+    clock.now += 2
+    assert agent.query_sync("perovskite solar cells") == "Second answer."
+    assert len(duckduckgo.paths) == 2
@@ -0,0 +1,33 @@
+from psycopg2 import OperationalError
+from psycopg2.pool import PoolError
+
+import app
+
+
+def failing_lookup(error):
+    def fetch_stored_abstract(topic, max_age_seconds=None):
+        raise error
+    return fetch_stored_abstract
+
+
+def test_index_generates_when_the_history_lookup_fails(monkeypatch):
+    monkeypatch.setattr(app, "fetch_stored_abstract", failing_lookup(OperationalError("could not connect")))
+    monkeypatch.setattr(app, "generate_abstract", lambda topic: f"fresh abstract on {topic}")
+
+    response = app.app.test_client().post("/", data={'topic': "quantum sensing"})
+    assert response.status_code == 200
+    assert b"fresh abstract on quantum sensing" in response.data
+
+
+def test_run_job_generates_when_the_pool_is_exhausted(monkeypatch):
+    monkeypatch.setattr(app, "fetch_stored_abstract", failing_lookup(PoolError("Timed out waiting")))
+    monkeypatch.setattr(app, "generate_abstract", lambda topic: "fresh")
+
+    assert app.run_job("quantum sensing") == "fresh"
+
+
+def test_stored_abstract_is_still_reused(monkeypatch):
+    monkeypatch.setattr(app, "fetch_stored_abstract", lambda topic, max_age_seconds=None: "stored")
+    monkeypatch.setattr(app, "generate_abstract", lambda topic: "fresh")
+
+    assert app.run_job("quantum sensing") == "stored"
@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import TypedDict
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+
+import checkpointing
+
+
+class State(TypedDict):
+    topic: str
+    notes: str
+    abstract: str
+
+
+def build(calls, fail_abstract, delay=0.0):
+    def research(state):
+        calls.append("research")
+        time.sleep(delay)
+        return {'notes': f"notes on {state['topic']}"}
+
+    def abstract(state):
+        calls.append("abstract")
+        if fail_abstract.is_set():
+            raise RuntimeError("abstract failed")
+        return {'abstract': state['notes'].upper()}
+
+    graph = StateGraph(State)
+    graph.add_node("research", research)
+    graph.add_node("abstract", abstract)
+    graph.add_edge(START, "research")
+    graph.add_edge("research", "abstract")
+    graph.add_edge("abstract", END)
+    return graph.compile(checkpointer=InMemorySaver())
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(checkpointing, "_registry", checkpointing.MemoryRunRegistry())
+
+
+def state(topic):
+    return {'topic': topic, 'notes': '', 'abstract': ''}
+
+
+def test_failed_run_resumes_after_the_last_finished_node():
+    calls, fail = [], threading.Event()
+    graph = build(calls, fail)
+    fail.set()
+    with pytest.raises(RuntimeError):
+        checkpointing.invoke(graph, state("Quantum error correction"), "Quantum error correction")
+
+    fail.clear()
+    result = checkpointing.invoke(graph, state("quantum  error correction"), "quantum  error correction")
+
+    assert result['abstract'] == "NOTES ON QUANTUM ERROR CORRECTION"
+    assert calls == ["research", "abstract", "abstract"]
+    assert checkpointing.get_run_registry().runs == {}
+
+
+def test_concurrent_runs_for_one_topic_do_not_share_a_thread():
+    calls, fail = [], threading.Event()
+    graph = build(calls, fail, delay=0.05)
+    results = []
+
+    def run():
+        results.append(checkpointing.invoke(graph, state("Quantum error correction"), "Quantum error correction"))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 4
+    assert calls.count("research") == 4 and calls.count("abstract") == 4
+    assert not graph.checkpointer.storage
+
+
+def test_a_failed_run_is_resumed_only_once():
+    calls, fail = [], threading.Event()
+    graph = build(calls, fail)
+    fail.set()
+    with pytest.raises(RuntimeError):
+        checkpointing.invoke(graph, state("topic"), "topic")
+
+    fail.clear()
+    checkpointing.invoke(graph, state("topic"), "topic")
+    checkpointing.invoke(graph, state("topic"), "topic")
+
+    assert calls == ["research", "abstract", "abstract", "research", "abstract"]
+
+
+def test_sqlite_registry_claims_once_and_reports_replaced_threads(tmp_path):
+    registry = checkpointing.SQLiteRunRegistry(str(tmp_path / "runs.sqlite3"))
+
+    assert registry.record("topic", "run-1") is None
+    assert registry.record("topic", "run-2") == "run-1"
+    assert registry.claim("topic") == "run-2"
+    assert registry.claim("topic") is None
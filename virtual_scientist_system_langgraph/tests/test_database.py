@@ -0,0 +1,104 @@
+import threading
+
+import psycopg2
+import pytest
+from psycopg2.pool import PoolError
+
+import database
+from database import WriteBehindQueue
+
+
+class Connection:
+    closed = 0
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class Pool:
+    def __init__(self, failures=0):
+        self.failures = failures
+
+    def getconn(self):
+        if self.failures:
+            self.failures -= 1
+            raise psycopg2.OperationalError("the database system is starting up")
+        return Connection()
+
+    def putconn(self, conn, close=False):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    def install(pool, slots):
+        monkeypatch.setattr(database, "_pool", pool)
+        monkeypatch.setattr(database, "_pool_slots", threading.BoundedSemaphore(slots))
+        return pool
+    return install
+
+
+def test_failed_getconn_gives_its_pool_slot_back(pool):
+    pool(Pool(failures=3), slots=2)
+    for _ in range(3):
+        with pytest.raises(psycopg2.OperationalError):
+            with database.pooled_connection():
+                pass
+
+    with database.pooled_connection() as conn:
+        assert isinstance(conn, Connection)
+
+
+def test_waiting_for_a_pool_slot_is_bounded(pool, monkeypatch):
+    pool(Pool(), slots=1)
+    monkeypatch.setenv("DB_POOL_WAIT_SECONDS", "0.05")
+
+    with database.pooled_connection():
+        with pytest.raises(PoolError):
+            with database.pooled_connection():
+                pass
+
+
+class Table:
+    def __init__(self, outages=0):
+        self.outages = outages
+        self.rows = []
+
+    def write(self, batch):
+        if self.outages:
+            self.outages -= 1
+            raise psycopg2.OperationalError("connection refused")
+        if any(len(topic) > 255 for topic, _ in batch):
+            raise psycopg2.DataError("value too long for type character varying(255)")
+        self.rows.extend(batch)
+
+
+def test_transient_failures_are_retried():
+    table = Table(outages=2)
+    writer = WriteBehindQueue(table.write, flush_interval=0.01, retry_backoff=0.01)
+    writer.put(("topic", "abstract"))
+    writer.flush()
+
+    assert table.rows == [("topic", "abstract")]
+
+
+def test_a_bad_row_does_not_lose_the_rest_of_its_batch():
+    table = Table()
+    writer = WriteBehindQueue(table.write, batch_size=3, flush_interval=1.0, retry_backoff=0.01)
+    for row in [("a", "1"), ("x" * 300, "2"), ("c", "3")]:
+        writer.put(row)
+    writer.flush()
+
+    assert table.rows == [("a", "1"), ("c", "3")]
+
+
+def test_rows_are_dropped_only_after_the_retries_run_out():
+    table = Table(outages=10)
+    writer = WriteBehindQueue(table.write, flush_interval=0.01, retries=2, retry_backoff=0.01)
+    writer.put(("topic", "abstract"))
+    writer.flush()
+
+    assert table.rows == [] and table.outages == 7
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import deadlines
+from deadlines import DeadlineExceeded, LatencyTracker, acall_with_deadline, call_with_deadline, degrade_on_deadline
+from metrics import current_node
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.delenv("NODE_DEADLINE_SECONDS", raising=False)
+    monkeypatch.setenv("HEDGE_ENABLED", "0")
+    monkeypatch.setattr(deadlines, "_tracker", LatencyTracker(min_samples=1))
+    return monkeypatch
+
+
+def test_sync_call_past_its_deadline_raises(settings):
+    settings.setenv("NODE_DEADLINE_S1", "0.05")
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call_with_deadline("S1", lambda: time.sleep(1))
+    assert time.monotonic() - started < 0.5
+
+
+def test_time_queued_for_a_pool_thread_does_not_count_against_the_deadline(settings):
+    settings.setenv("NODE_DEADLINE_S1", "0.15")
+    pool = ThreadPoolExecutor(max_workers=1)
+    settings.setattr(deadlines, "_executor", pool)
+    busy = pool.submit(time.sleep, 0.3)
+
+    assert call_with_deadline("S1", lambda: time.sleep(0.05) or "answer") == "answer"
+    busy.result()
+
+
+def test_pool_is_sized_for_every_request_thread_plus_hedges(settings):
+    settings.delenv("HEDGE_POOL_SIZE", raising=False)
+    settings.setenv("GUNICORN_THREADS", "16")
+    assert deadlines.pool_size() == 128
+
+
+def test_sync_call_keeps_the_callers_context_on_the_worker_thread(settings):
+    settings.setenv("NODE_DEADLINE_S1", "5")
+    token = current_node.set("query_s1")
+    try:
+        assert call_with_deadline("S1", current_node.get) == "query_s1"
+    finally:
+        current_node.reset(token)
+
+
+def test_sync_hedge_returns_the_faster_attempt(settings):
+    settings.setenv("HEDGE_ENABLED", "1")
+    settings.setenv("HEDGE_MIN_DELAY", "0.05")
+    deadlines._tracker.observe("S2", 0.01)
+    attempts = []
+
+    def call():
+        attempts.append(threading.get_ident())
+        if len(attempts) == 1:
+            time.sleep(1)
+            return "slow"
+        return "fast"
+
+    started = time.monotonic()
+    assert call_with_deadline("S2", call) == "fast"
+    assert time.monotonic() - started < 0.5
+
+
+def test_sync_error_is_raised_once_every_attempt_failed(settings):
+    settings.setenv("NODE_DEADLINE_S1", "5")
+
+    def call():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_deadline("S1", call)
+
+
+def test_async_late_call_is_cancelled(settings):
+    settings.setenv("NODE_DEADLINE_S3", "0.05")
+    cancelled = asyncio.Event()
+
+    async def call():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        with pytest.raises(DeadlineExceeded):
+            await acall_with_deadline("S3", call)
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+
+    asyncio.run(run())
+
+
+def test_missed_deadline_marks_the_section_missing(settings):
+    def node(state):
+        raise DeadlineExceeded("S2", 1.0)
+
+    assert degrade_on_deadline("S2", "s2_response", node)({}) == {'s2_response': '', 'missing_sections': ['S2']}
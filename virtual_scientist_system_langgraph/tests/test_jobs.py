@@ -0,0 +1,32 @@
+import jobs
+from jobs import DONE, FAILED, JobQueue, SQLiteJobStore
+
+
+def test_jobs_queued_before_a_restart_are_claimed_without_a_new_submit(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = SQLiteJobStore(path).enqueue("a" * 32, "quantum sensing")
+
+    monkeypatch.setenv("JOB_BACKEND", "sqlite")
+    monkeypatch.setenv("JOB_DB_PATH", path)
+    monkeypatch.setenv("JOB_POLL_INTERVAL", "0.05")
+    monkeypatch.setattr(jobs, "_queue", None)
+    queue = jobs.get_job_queue(lambda topic: f"abstract for {topic}")
+
+    job = queue.wait(job_id, 5)
+    assert job['status'] == DONE and job['result'] == "abstract for quantum sensing"
+
+
+def test_concurrent_submissions_of_one_topic_share_a_job(tmp_path):
+    queue = JobQueue(SQLiteJobStore(str(tmp_path / "jobs.sqlite3")), lambda topic: topic, workers=0)
+
+    assert queue.submit("Quantum sensing") == queue.submit("quantum  sensing")
+
+
+def test_failed_run_marks_the_job_failed(tmp_path):
+    def run(topic):
+        raise RuntimeError("graph failed")
+
+    queue = JobQueue(SQLiteJobStore(str(tmp_path / "jobs.sqlite3")), run, workers=1, poll_interval=0.05)
+    job = queue.wait(queue.submit("topic"), 5)
+
+    assert job['status'] == FAILED and job['error'] == "graph failed"
@@ -0,0 +1,13 @@
+import llm_client
+from llm_backends import FakeBackend
+
+
+def test_fake_backend_bypasses_the_groq_rate_limiter(monkeypatch):
+    def governor():
+        raise AssertionError("fake calls must not wait on the Groq governor")
+
+    monkeypatch.setattr(llm_client, "get_governor", governor)
+    backend = FakeBackend("fake-model")
+    params = dict(model=backend.model, max_tokens=5, messages=[{"role": "user", "content": "topic"}])
+
+    assert llm_client.create_completion(backend.client(), **params).choices[0].message.content
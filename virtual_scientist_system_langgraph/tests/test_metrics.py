@@ -0,0 +1,25 @@
+import json
+import threading
+import time
+
+import log_config
+import metrics
+
+
+def test_spans_are_written_without_holding_the_metrics_lock(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setenv("TRACE_SPANS", "1")
+    monkeypatch.setenv("TRACE_FILE", str(path))
+    monkeypatch.setattr(log_config, "_span_logger", None)
+    monkeypatch.setattr(log_config.logging.getLogger("scientist.spans"), "handlers", [])
+
+    with metrics._lock:
+        emitter = threading.Thread(target=metrics.emit_span, args=({'span': "node", 'node': "query_s1"},))
+        emitter.start()
+        emitter.join(2)
+        assert not emitter.is_alive()
+
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and not (path.exists() and path.read_text()):
+        time.sleep(0.01)
+    assert json.loads(path.read_text()) == {'span': "node", 'node': "query_s1"}
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from micro_batch import AsyncMicroBatcher, MicroBatcher
+
+
+def params(topic):
+    return {"model": "m", "messages": [{"role": "system", "content": "prompt"}, {"role": "user", "content": topic}]}
+
+
+def _reply(params, calls):
+    calls.append(params)
+    if params.get("response_format"):
+        items = json.loads(params["messages"][1]["content"])
+        content = json.dumps({item["id"]: f"answer {item['input']}" for item in items})
+    else:
+        content = f"single {params['messages'][1]['content']}"
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+class Client:
+    rate_limited = False
+
+    def __init__(self, delay=0.01):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+        self.delay = delay
+
+    def create(self, **params):
+        time.sleep(self.delay)
+        return _reply(params, self.calls)
+
+
+class AsyncClient(Client):
+    async def create(self, **params):
+        await asyncio.sleep(self.delay)
+        return _reply(params, self.calls)
+
+
+def test_concurrent_threads_share_one_completion():
+    client = Client()
+    batcher = MicroBatcher(window=0.5, max_size=3)
+    results = {}
+
+    def call(topic):
+        results[topic] = batcher.complete(client, params(topic))
+
+    threads = [threading.Thread(target=call, args=(topic,)) for topic in "abc"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {topic: f"answer {topic}" for topic in "abc"}
+    assert len(client.calls) == 1
+
+
+def test_cancelled_leader_does_not_strand_its_batch():
+    async def run():
+        client = AsyncClient()
+        batcher = AsyncMicroBatcher(window=0.05, max_size=4)
+        leader = asyncio.ensure_future(batcher.complete(client, params("a")))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(batcher.complete(client, params("b")))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.wait_for(follower, 1) in ("answer b", "single b")
+        assert await asyncio.wait_for(batcher.complete(client, params("c")), 1) == "single c"
+        assert not batcher._open
+
+    asyncio.run(run())
+
+
+def test_cancelled_dispatch_releases_members_to_call_alone():
+    async def run():
+        client = AsyncClient()
+        batcher = AsyncMicroBatcher(window=10, max_size=4)
+        first = asyncio.ensure_future(batcher.complete(client, params("a")))
+        second = asyncio.ensure_future(batcher.complete(client, params("b")))
+        await asyncio.sleep(0.01)
+        for task in list(batcher._tasks):
+            task.cancel()
+
+        assert await asyncio.wait_for(asyncio.gather(first, second), 1) == ["single a", "single b"]
+
+    asyncio.run(run())
+
+
+def test_cancelled_member_is_left_out_of_the_packed_request():
+    async def run():
+        client = AsyncClient()
+        batcher = AsyncMicroBatcher(window=0.05, max_size=4)
+        tasks = [asyncio.ensure_future(batcher.complete(client, params(topic))) for topic in "abc"]
+        await asyncio.sleep(0.01)
+        tasks[1].cancel()
+
+        assert await asyncio.wait_for(asyncio.gather(tasks[0], tasks[2]), 1) == ["answer a", "answer c"]
+        packed = json.loads(client.calls[0]["messages"][1]["content"])
+        assert [item["input"] for item in packed] == ["a", "c"]
+
+    asyncio.run(run())
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def test_transient_batch_failure_raises_for_every_member():
+    class Failing(AsyncClient):
+        async def create(self, **params):
+            raise APIError(503)
+
+    async def run():
+        batcher = AsyncMicroBatcher(window=0.02, max_size=4)
+        client = Failing()
+        results = await asyncio.gather(*(batcher.complete(client, params(topic)) for topic in "ab"),
+                                       return_exceptions=True)
+        assert all(isinstance(result, APIError) for result in results)
+
+    asyncio.run(run())
+
+
+def test_rejected_batch_falls_back_to_individual_calls():
+    class RejectsPacked(AsyncClient):
+        async def create(self, **params):
+            if params.get("response_format"):
+                raise APIError(400)  # e.g. the packed prompt exceeds the context length
+            return await super().create(**params)
+
+    async def run():
+        batcher = AsyncMicroBatcher(window=0.02, max_size=4)
+        client = RejectsPacked()
+        results = await asyncio.gather(*(batcher.complete(client, params(topic)) for topic in "ab"))
+        assert results == ["single a", "single b"]
+
+    asyncio.run(run())
+
+
+def test_rejected_sync_batch_falls_back_to_individual_calls():
+    class RejectsPacked(Client):
+        def create(self, **params):
+            if params.get("response_format"):
+                raise APIError(400)
+            return super().create(**params)
+
+    client = RejectsPacked()
+    batcher = MicroBatcher(window=0.2, max_size=2)
+    results = {}
+
+    def call(topic):
+        results[topic] = batcher.complete(client, params(topic))
+
+    threads = [threading.Thread(target=call, args=(topic,)) for topic in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {'a': "single a", 'b': "single b"}
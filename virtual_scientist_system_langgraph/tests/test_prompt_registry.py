@@ -0,0 +1,57 @@
+import pytest
+
+import prompt_registry
+from prompt_registry import get_prompt, register_prompt
+
+
+@pytest.fixture(autouse=True)
+def empty_registry(monkeypatch):
+    monkeypatch.setattr(prompt_registry, "_templates", {})
+
+
+def test_declared_fields_must_match_the_placeholders():
+    with pytest.raises(ValueError, match="declares"):
+        register_prompt("summary", "Summarize {TOPIC} for {AUDIENCE}.", fields=("TOPIC",))
+    with pytest.raises(ValueError, match="declares"):
+        register_prompt("summary", "Summarize {TOPIC}.", fields=("TOPIC", "AUDIENCE"))
+    with pytest.raises(KeyError):
+        get_prompt("summary")  # nothing was registered
+
+    template = register_prompt("summary", "Summarize {TOPIC}.")
+    assert template.fields == {"TOPIC"}
+
+
+@pytest.mark.parametrize("text", ["{TOPIC!r}", "{TOPIC:>5}", "{TOPIC.upper}", "{0}", "{}"])
+def test_only_plain_placeholders_are_accepted(text):
+    with pytest.raises(ValueError, match="unsupported placeholder"):
+        register_prompt("summary", f"Summarize {text}.")
+
+
+def test_render_requires_every_field():
+    template = register_prompt("summary", "Summarize {TOPIC} in {{braces}}.", fields=("TOPIC",))
+    assert template.render(TOPIC="graphene") == "Summarize graphene in {braces}."
+    with pytest.raises(KeyError, match="TOPIC"):
+        template.render()
+
+
+def test_version_is_selected_per_prompt_by_environment(monkeypatch):
+    register_prompt("S1", "first", version="v1")
+    register_prompt("S1", "second", version="v2")
+    register_prompt("S2", "only", version="v1")
+
+    assert get_prompt("S1").text == "second"  # latest registration by default
+
+    monkeypatch.setenv("PROMPT_VERSION_S1", "v1")
+    assert get_prompt("S1").text == "first"
+    assert get_prompt("S2").text == "only"
+
+    monkeypatch.setenv("PROMPT_VERSION_S2", "v9")
+    with pytest.raises(KeyError, match="v9"):
+        get_prompt("S2")
+
+
+def test_lowercase_names_use_an_uppercase_variable(monkeypatch):
+    register_prompt("final", "old", version="v1")
+    register_prompt("final", "new", version="v2")
+    monkeypatch.setenv("PROMPT_VERSION_FINAL", "v1")
+    assert get_prompt("final").text == "old"
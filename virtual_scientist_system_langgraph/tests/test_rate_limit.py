@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from rate_limit import AdaptiveConcurrency, CallGovernor, RateLimiter, TokenBucket, retry_delay
+
+
+class APIError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={'retry-after': retry_after} if retry_after else {})
+
+
+def governor(max_limit=4):
+    return CallGovernor(RateLimiter(0, 0), AdaptiveConcurrency(1, max_limit), base_delay=0.001, max_delay=0.01)
+
+
+def test_bucket_reports_the_wait_once_it_runs_dry():
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_disabled_bucket_never_waits():
+    assert TokenBucket(per_minute=0).reserve(10_000) == 0
+
+
+def test_throttling_halves_the_cap_and_successes_raise_it_again():
+    concurrency = AdaptiveConcurrency(1, 8)
+    concurrency.on_throttle()
+    concurrency.on_throttle()
+    assert concurrency.limit == 2
+
+    for _ in range(20):
+        concurrency.on_success()
+    assert 2 < concurrency.limit <= 8
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def run():
+        concurrency = AdaptiveConcurrency(1, 1)
+        await concurrency.aacquire()
+        waiter = asyncio.ensure_future(concurrency.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        concurrency.release()
+        await asyncio.wait_for(concurrency.aacquire(), 1)
+        assert concurrency.in_flight == 1 and not concurrency.waiters
+
+    asyncio.run(run())
+
+
+def test_waiter_cancelled_after_being_granted_gives_the_slot_back():
+    async def run():
+        concurrency = AdaptiveConcurrency(1, 1)
+        await concurrency.aacquire()
+        waiter = asyncio.ensure_future(concurrency.aacquire())
+        await asyncio.sleep(0)
+        concurrency.release()  # grants the slot to the waiter
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert concurrency.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_throttled_calls_are_retried_and_shrink_the_cap():
+    calls = []
+    limiter = governor()
+
+    def call():
+        calls.append(1)
+        if len(calls) < 3:
+            raise APIError(429)
+        return "ok"
+
+    assert limiter.call(call, tokens=10) == "ok"
+    assert len(calls) == 3
+    assert limiter.concurrency.limit < 4 and limiter.concurrency.in_flight == 0
+
+
+def test_client_errors_are_not_retried_and_release_their_slot():
+    calls = []
+    limiter = governor()
+
+    async def call():
+        calls.append(1)
+        raise APIError(400)
+
+    with pytest.raises(APIError):
+        asyncio.run(limiter.acall(call, tokens=10))
+    assert len(calls) == 1 and limiter.concurrency.in_flight == 0
+
+
+def test_retry_after_header_is_honoured():
+    assert 2.0 <= retry_delay(APIError(429, retry_after="2"), 0, 0.5, 20) <= 2.5
@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+import app
+import lifecycle
+from async_runner import run_blocking
+from metrics import current_node
+
+
+def test_run_blocking_gives_up_after_the_timeout():
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        run_blocking(lambda: time.sleep(1), 0.05)
+    assert time.monotonic() - started < 0.5
+
+
+def test_run_blocking_keeps_the_callers_context():
+    token = current_node.set("index")
+    try:
+        assert run_blocking(current_node.get, 1) == "index"
+    finally:
+        current_node.reset(token)
+
+
+def test_sync_generate_abstract_is_bounded_by_the_request_timeout(monkeypatch):
+    release = threading.Event()
+    finished = threading.Semaphore(0)
+
+    def slow_invoke(graph, state, topic):
+        release.wait(5)
+        finished.release()
+        return {'final_abstract': "late"}
+
+    monkeypatch.setenv("GRAPH_MODE", "sync")
+    monkeypatch.setenv("REQUEST_TIMEOUT_SECONDS", "0.05")
+    monkeypatch.setattr(app, "get_graph", lambda name: None)
+    monkeypatch.setattr(app.checkpointing, "invoke", slow_invoke)
+
+    before = lifecycle.in_flight()
+    try:
+        with pytest.raises(TimeoutError):
+            app.generate_abstract("quantum sensing")
+        assert lifecycle.in_flight() == before + 1  # the run keeps going in the background
+
+        response = app.app.test_client().post("/", data={'topic': "quantum sensing"})
+        assert response.status_code == 504
+    finally:
+        release.set()
+        for _ in range(2):
+            assert finished.acquire(timeout=5)
+
+    deadline = time.monotonic() + 5
+    while lifecycle.in_flight() != before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert lifecycle.in_flight() == before
+
+
+def test_request_timeout_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("REQUEST_TIMEOUT_SECONDS", "0")
+    assert app.request_timeout() is None
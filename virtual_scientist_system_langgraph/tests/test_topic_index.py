@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from topic_index import TopicIndex, vectorize
+
+# Gives the index realistic document frequencies: "computing" and "learning" are common words
+BACKGROUND = [
+    "quantum computing hardware", "edge computing security", "cloud computing costs", "neuromorphic computing",
+    "computing education", "deep learning for protein folding", "reinforcement learning in robotics",
+    "transfer learning for speech", "federated learning privacy", "solar cell efficiency", "battery recycling",
+    "urban heat islands", "soil microbiome", "antibiotic resistance", "ocean acidification",
+] + [f"survey of topic {i} research" for i in range(40)]
+
+STORED = [
+    "type 1 diabetes treatment",
+    "machine learning for fraud detection",
+    "quantum error correction",
+    "graph neural networks for drug discovery",
+]
+
+
+def build(tmp_path, topics):
+    index = TopicIndex(str(tmp_path), dim=256)
+    for topic in BACKGROUND + topics:
+        index.add(topic)
+    return index
+
+
+@pytest.fixture
+def index(tmp_path):
+    return build(tmp_path, STORED)
+
+
+@pytest.mark.parametrize("query", [
+    "type 2 diabetes treatment",
+    "machine learning for cancer detection",
+])
+def test_topics_differing_in_a_number_or_a_rare_word_never_match(index, query):
+    assert index.search(query) is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Type 1 Diabetes Treatment", "type 1 diabetes treatment"),
+    ("fraud detection using machine learning", "machine learning for fraud detection"),
+    ("drug discovery with graph neural networks", "graph neural networks for drug discovery"),
+])
+def test_rewordings_of_a_stored_topic_match(index, query, expected):
+    stored, score = index.search(query)
+    assert stored == expected and score > 0.99
+
+
+def test_an_extra_common_word_still_matches(index):
+    stored, score = index.search("error correction in quantum computing")
+    assert stored == "quantum error correction" and score > 0.85
+
+
+def test_a_stored_topic_with_an_extra_common_word_still_matches(tmp_path):
+    index = build(tmp_path, ["error correction in quantum computing"])
+
+    stored, score = index.search("quantum error correction")
+    assert stored == "error correction in quantum computing" and score > 0.85
+
+
+def test_extra_stored_terms_lower_the_score_below_the_default_threshold(index):
+    stored, score = index.search("fraud detection")
+    assert stored == "machine learning for fraud detection" and score < 0.85
+
+
+def test_rows_stay_aligned_after_a_writer_died_between_its_two_writes(tmp_path):
+    index = build(tmp_path, STORED)
+    with open(index.vectors_path, "ab") as handle:
+        handle.write(np.ones(index.dim, dtype=np.float32).tobytes())  # vector written, topic line never was
+
+    index.add("soil carbon sequestration")
+    fresh = TopicIndex(str(tmp_path), dim=256)
+
+    assert len(fresh) == len(BACKGROUND) + len(STORED) + 1
+    assert np.allclose(fresh.matrix[-1], vectorize("soil carbon sequestration", fresh.dim))
@@ -0,0 +1,57 @@
+import asyncio
+
+import app
+
+
+class StubScientist:
+    asked = {}
+
+    def __init__(self, name, backend, prompt):
+        self.name = name
+
+    def query_tool(self, topic, context=""):
+        StubScientist.asked[self.name] = context
+        return f"{self.name} notes"
+
+
+class AsyncStubScientist(StubScientist):
+    async def query_tool(self, topic, context=""):
+        return StubScientist.query_tool(self, topic, context)
+
+
+def no_abstract(state):
+    return {'final_abstract': ''}
+
+
+async def ano_abstract(state):
+    return {'final_abstract': ''}
+
+
+def stub_scientists(monkeypatch):
+    StubScientist.asked = {}
+    monkeypatch.setattr(app, "get_backend", lambda role: None)
+    monkeypatch.setattr(app, "get_prompt", lambda role: None)
+    monkeypatch.setattr(app, "Scientist", StubScientist)
+    monkeypatch.setattr(app, "AsyncScientist", AsyncStubScientist)
+
+
+def test_context_mode_argument_overrides_the_environment(monkeypatch):
+    stub_scientists(monkeypatch)
+    monkeypatch.setenv("S0_MODE", "parallel")
+    nodes = {**app.SYNC_NODES, "abstract_generation": no_abstract}
+    app.create_workflow(nodes, mode="context").compile().invoke(app.new_state("quantum sensing"))
+
+    assert StubScientist.asked["S0"] == ""
+    for name in ("S1", "S2", "S3"):
+        assert StubScientist.asked[name] == "Notes from S0:\nS0 notes"
+
+
+def test_async_nodes_follow_the_mode_argument(monkeypatch):
+    stub_scientists(monkeypatch)
+    monkeypatch.setenv("S0_MODE", "context")
+    nodes = {**app.ASYNC_NODES, "abstract_generation": ano_abstract}
+    graph = app.create_workflow(nodes, mode="serial").compile()
+    asyncio.run(graph.ainvoke(app.new_state("quantum sensing")))
+
+    for name in ("S1", "S2", "S3"):
+        assert StubScientist.asked[name] == ""
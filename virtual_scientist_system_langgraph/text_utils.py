@@ -0,0 +1,3 @@
+def normalize_topic(topic):
+    """Collapses whitespace and casing so trivially different topics share cache and history entries."""
+    return " ".join(topic.split()).casefold()
@@ -0,0 +1,249 @@
+"""Similarity index over topics that already have a stored abstract.
+
+Each topic becomes a hashed term-frequency vector (whole words plus character trigrams, so
+"quantum error correction" and "error correction in quantum computing" land close together),
+L2-normalized and appended to a float32 matrix memory-mapped from TOPIC_INDEX_PATH. A lookup
+only scores the rows that share a word with the query - taken from an inverted index, rarest
+words first - with one vectorized dot product. The closest few are then checked term by term:
+a stored topic is rejected when the two differ in a number, or when one swaps a distinguishing
+(rare, high-IDF) word for another, so "type 1 diabetes" never matches "type 2 diabetes" and
+"cancer detection" never matches "fraud detection". The rest are scored by an IDF-weighted
+cosine over their terms, so an extra common word costs little and an extra rare one a lot.
+This keeps a lookup well under a millisecond at 100k+ topics instead of scanning
+research_chat_history.
+
+The files are append-only and guarded by a file lock, so every server process on the host
+shares one index and picks up the others' additions on its next lookup.
+
+    python topic_index.py --rebuild   # index every topic already in research_chat_history
+"""
+import argparse
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+from dotenv import load_dotenv
+from context_builder import STOPWORDS
+from text_utils import normalize_topic
+
+load_dotenv()
+
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.3
+# Candidates by vector similarity that get the exact IDF-weighted score
+RERANK = 16
+# A word in at least this share of indexed topics is common rather than distinguishing
+COMMON_FRACTION = 0.01
+# Connectives that change how a topic is phrased but not what it is about
+FILLER_WORDS = frozenset("using via use based toward towards within across among versus vs".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def topic_words(topic):
+    return [word for word in _WORD.findall(topic.casefold()) if word not in STOPWORDS]
+
+
+def topic_terms(topic):
+    """Words of `topic` with a plural "s" dropped, so "network" and "networks" count as one term."""
+    return {word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+            for word in topic_words(topic) if word not in FILLER_WORDS}
+
+
+def _add_feature(vector, feature, weight):
+    # crc32 rather than hash(), which is salted per process
+    digest = zlib.crc32(feature.encode("utf-8"))
+    vector[digest % len(vector)] += weight if digest & 0x10000 else -weight
+
+
+def vectorize(topic, dim):
+    import numpy as np
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in topic_words(topic):
+        _add_feature(vector, "w:" + word, WORD_WEIGHT)
+        padded = f"#{word}#"
+        for start in range(len(padded) - 2):
+            _add_feature(vector, "c:" + padded[start:start + 3], TRIGRAM_WEIGHT)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class TopicIndex:
+    def __init__(self, path="topic_index", dim=1024, max_candidates=4096):
+        os.makedirs(path, exist_ok=True)
+        self.dim = dim
+        self.max_candidates = max_candidates
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.topics_path = os.path.join(path, "topics.jsonl")
+        self.lock_path = os.path.join(path, ".lock")
+        self.topics = []
+        self.rows = {}
+        self.postings = defaultdict(list)
+        self.matrix = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Loads topics appended since the last call, by this or any other process."""
+        try:
+            size = os.path.getsize(self.topics_path)
+        except FileNotFoundError:
+            return
+        if size == self._offset:
+            return
+
+        import numpy as np
+
+        with open(self.topics_path, "rb") as handle:
+            handle.seek(self._offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break  # a write still in progress
+                self._offset += len(line)
+                topic = json.loads(line)
+                row = len(self.topics)
+                self.topics.append(topic)
+                self.rows.setdefault(normalize_topic(topic), row)
+                for term in topic_terms(topic):
+                    self.postings[term].append(row)
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.topics), self.dim))
+
+    def _discard_partial_writes(self):
+        """Cuts off what a writer that died mid-add() left behind, so rows and topics stay aligned.
+
+        Called under the file lock, when no other writer can be mid-add().
+        """
+        for path, size in ((self.vectors_path, len(self.topics) * self.dim * 4), (self.topics_path, self._offset)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def add(self, topic):
+        """Indexes `topic` unless an identical (normalized) topic is already present."""
+        with self._lock, open(self.lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._refresh()
+            if normalize_topic(topic) in self.rows:
+                return
+            self._discard_partial_writes()
+            # Vector first: a reader that sees the topic line can always map its row
+            with open(self.vectors_path, "ab") as handle:
+                handle.write(vectorize(topic, self.dim).tobytes())
+            with open(self.topics_path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(topic) + "\n")
+            self._refresh()
+
+    def _idf(self, term):
+        return math.log((len(self.topics) + 1) / (len(self.postings.get(term, ())) + 1)) + 1
+
+    def _weighted_similarity(self, query_terms, terms):
+        """Cosine of the IDF-weighted term sets."""
+        weight = {term: self._idf(term) ** 2 for term in query_terms | terms}
+        shared = sum(weight[term] for term in query_terms & terms)
+        return shared / math.sqrt(sum(weight[term] for term in query_terms) * sum(weight[term] for term in terms))
+
+    def _distinguishing(self, term):
+        return len(self.postings.get(term, ())) < max(2, COMMON_FRACTION * len(self.topics))
+
+    def _conflicts(self, query_terms, terms):
+        """True when the topics differ in a number or swap a distinguishing word for another."""
+        missing, extra = terms - query_terms, query_terms - terms
+        if any(char.isdigit() for term in missing | extra for char in term):
+            return True
+        return bool(missing and extra) and any(self._distinguishing(term) for term in missing | extra)
+
+    def search(self, topic):
+        """Returns (stored_topic, similarity) of the closest compatible indexed topic, or None."""
+        import numpy as np
+
+        with self._lock:
+            self._refresh()
+            query_terms = topic_terms(topic)
+            postings = sorted((self.postings[term] for term in query_terms if term in self.postings), key=len)
+            if not postings:
+                return None
+
+            candidates, total = [], 0
+            for rows in postings:
+                candidates.append(rows)
+                total += len(rows)
+                if total >= self.max_candidates:
+                    break
+            rows = np.unique(np.concatenate([np.asarray(rows, dtype=np.int64) for rows in candidates]))
+            scores = self.matrix[rows] @ vectorize(topic, self.dim)
+            best = None
+            for position in np.argsort(-scores)[:RERANK]:
+                stored = self.topics[rows[position]]
+                terms = topic_terms(stored)
+                if self._conflicts(query_terms, terms):
+                    continue
+                score = self._weighted_similarity(query_terms, terms)
+                if best is None or score > best[1]:
+                    best = (stored, score)
+            return best
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self.topics)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_topic_index():
+    """Returns the process-wide index stored under TOPIC_INDEX_PATH."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TopicIndex(
+                    os.getenv("TOPIC_INDEX_PATH", "topic_index"),
+                    dim=int(os.getenv("TOPIC_INDEX_DIM", "1024")),
+                    max_candidates=int(os.getenv("TOPIC_INDEX_MAX_CANDIDATES", "4096")),
+                )
+    return _index
+
+
+def index_enabled():
+    return os.getenv("TOPIC_INDEX_ENABLED", "1") != "0"
+
+
+def similarity_threshold():
+    return float(os.getenv("TOPIC_SIMILARITY_THRESHOLD", "0.85"))
+
+
+def similar_topic(topic):
+    """Returns the stored topic closest to `topic` if it clears TOPIC_SIMILARITY_THRESHOLD, else None."""
+    if not index_enabled():
+        return None
+    match = get_topic_index().search(topic)
+    if match is None or match[1] < similarity_threshold():
+        return None
+    return match[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the topic similarity index.")
+    parser.add_argument("--rebuild", action="store_true", help="index every topic in research_chat_history")
+    parser.add_argument("--query", help="print the closest indexed topic and its similarity")
+    args = parser.parse_args()
+
+    index = get_topic_index()
+    if args.rebuild:
+        from database import fetch_stored_topics
+
+        for topic in fetch_stored_topics():
+            index.add(topic)
+        print(f"Indexed {len(index)} topics")
+    if args.query:
+        print(index.search(args.query))
+
+
+if __name__ == "__main__":
+    main()
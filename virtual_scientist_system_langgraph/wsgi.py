@@ -0,0 +1,15 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker imports this module after forking, so database pools and HTTP clients are never
+shared across processes.
+"""
+from app import app, run_job
+from database import ensure_schema, history_enabled
+from graph_registry import warm_up
+from jobs import get_job_queue
+
+if history_enabled():
+    ensure_schema()
+warm_up()
+# Claim jobs left in the queue by a previous process without waiting for a new POST /jobs
+get_job_queue(run_job)